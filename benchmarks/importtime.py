@@ -0,0 +1,87 @@
+"""Check the import-time budget of the notebook's imports.
+
+Run from the repository root:
+
+    python -m benchmarks.importtime
+
+Collects the import statements of the notebook cells that a headless run
+executes, runs them in a fresh interpreter under ``python -X importtime``
+and reports the slowest top-level modules. Exits with status 1 when the
+total exceeds `BUDGET_SECONDS` or when any of the `DEFERRED` modules is
+imported eagerly; those must only be imported by the code paths that
+use them.
+"""
+
+import ast
+import re
+import subprocess
+import sys
+
+from christina_paper.runner import DEFAULT_NOTEBOOK, cell_graph, parse_cells, skipped_cells
+
+BUDGET_SECONDS = 0.5
+
+# Heavy modules that may not be imported before the data is touched
+DEFERRED = ("altair", "marimo", "openpyxl", "pandas", "scipy", "statsmodels")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def notebook_imports() -> str:
+    """The import statements of every cell a headless run executes."""
+    cells = parse_cells(DEFAULT_NOTEBOOK)
+    skipped = skipped_cells(cells, cell_graph(cells))
+    statements = []
+    for cell in cells:
+        if cell.index in skipped:
+            continue
+        for node in ast.walk(ast.parse(cell.code)):
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                statements.append(ast.unparse(node))
+    return "\n".join(statements)
+
+
+def measure(code: str) -> list[tuple[str, int, int, int]]:
+    """(module, self microseconds, cumulative microseconds, depth) of each import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((name, int(own), int(cumulative), len(indent) // 2))
+    return modules
+
+
+def main() -> None:
+    code = notebook_imports()
+    modules = measure(code)
+    top_level = sorted((m for m in modules if m[3] == 0), key=lambda m: m[2], reverse=True)
+    total = sum(m[2] for m in top_level) / 1e6
+
+    print(f"{'module':<40} {'cumulative':>12}")
+    for name, _, cumulative, _ in top_level[:10]:
+        print(f"{name:<40} {cumulative / 1e3:>10.1f}ms")
+    print(f"{'total':<40} {total * 1e3:>10.1f}ms (budget {BUDGET_SECONDS * 1e3:.0f}ms)")
+
+    eager = sorted({
+        name.split(".")[0] for name, *_ in modules if name.split(".")[0] in DEFERRED
+    })
+    failures = []
+    if total > BUDGET_SECONDS:
+        failures.append(f"import time {total:.3f}s exceeds the {BUDGET_SECONDS}s budget")
+    if eager:
+        failures.append(f"deferred modules imported eagerly: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
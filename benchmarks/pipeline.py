@@ -0,0 +1,140 @@
+"""Benchmark each stage of the analysis pipeline on synthetic data.
+
+Run from the repository root:
+
+    python -m benchmarks.pipeline [--sizes 1000 100000 10000000] [--repeat 3]
+
+For each size a synthetic 'full dataset' (`benchmarks.synthetic`) is
+pushed through the stages of the notebook, each timed on its own:
+
+- ``parse``: `load_workbook` of the sheet written as .xlsx (sizes beyond
+  `PARSE_MAX_ROWS` are skipped: Excel caps a sheet at about 10^6 rows and
+  writing the workbook would dominate the run);
+- ``cohorts``: collecting the patients of every cohort;
+- ``contingency``: the shared `contingency_tables` ``group_by``;
+- ``intervals``: `agreement_metrics`, the PPA/NPA with Wilson CIs;
+- ``summary``: formatting the metrics as the notebook prints them.
+
+Each stage reports the best of ``--repeat`` runs. The results are written
+to ``benchmarks/results/<timestamp>-<commit>.json`` and compared with the
+most recent earlier file, so a regression between commits shows up as a
+ratio above 1.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import polars as pl
+
+from benchmarks.synthetic import synthetic_full_dataset, synthetic_workbook
+from christina_paper.agreement import agreement_metrics
+from christina_paper.cohorts import COHORTS, cohort, contingency_tables
+from christina_paper.schema import FULL_DATASET_SHEET, WORKBOOK_SCHEMAS
+from christina_paper.workbook import load_workbook
+
+SIZES = [10**3, 10**5, 10**7]
+PARSE_MAX_ROWS = 10**5
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _best_of(repeat: int, stage) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = stage()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _summary(metrics: pl.DataFrame) -> str:
+    return "\n".join(
+        f"{row['cohort']} {row['metric']} ({row['equivocals']}): {row['estimate']:.2%} "
+        f"(95% CI: {row['ci_lower']:.2%} - {row['ci_upper']:.2%})"
+        for row in metrics.iter_rows(named=True)
+    )
+
+
+def benchmark_size(n_rows: int, repeat: int) -> dict[str, float | None]:
+    """Seconds per stage for one synthetic dataset of ``n_rows`` rows."""
+    timings: dict[str, float | None] = {}
+    if n_rows <= PARSE_MAX_ROWS:
+        path = synthetic_workbook(n_rows)
+        timings["parse"], sheets = _best_of(
+            repeat,
+            lambda: load_workbook(path, sheet_names=[FULL_DATASET_SHEET], schemas=WORKBOOK_SCHEMAS),
+        )
+        frame = sheets[FULL_DATASET_SHEET]
+    else:
+        timings["parse"] = None
+        frame = synthetic_full_dataset(n_rows)
+
+    timings["cohorts"], _ = _best_of(
+        repeat,
+        lambda: pl.collect_all([cohort(frame, c.label) for c in COHORTS.values()]),
+    )
+    timings["contingency"], counts = _best_of(repeat, lambda: contingency_tables(frame))
+    timings["intervals"], metrics = _best_of(repeat, lambda: agreement_metrics(counts))
+    timings["summary"], _ = _best_of(repeat, lambda: _summary(metrics))
+    return timings
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _previous_results(before: Path) -> dict | None:
+    earlier = sorted(p for p in RESULTS_DIR.glob("*.json") if p.name < before.name)
+    return json.loads(earlier[-1].read_text()) if earlier else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    started = datetime.now(timezone.utc)
+    commit = _commit()
+    results = {
+        "commit": commit,
+        "timestamp": started.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+    for n_rows in args.sizes:
+        results["sizes"][str(n_rows)] = benchmark_size(n_rows, args.repeat)
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"{started:%Y%m%dT%H%M%S}-{commit}.json"
+    path.write_text(json.dumps(results, indent=2) + "\n")
+    previous = _previous_results(path)
+
+    print(f"{'rows':>12} {'stage':<12} {'seconds':>10} {'vs previous':>12}")
+    for size, timings in results["sizes"].items():
+        before = (previous or {}).get("sizes", {}).get(size, {})
+        for stage, seconds in timings.items():
+            if seconds is None:
+                print(f"{int(size):>12,} {stage:<12} {'skipped':>10}")
+                continue
+            ratio = f"x{seconds / before[stage]:.2f}" if before.get(stage) else ""
+            print(f"{int(size):>12,} {stage:<12} {seconds:>10.4f} {ratio:>12}")
+    if previous:
+        print(f"Compared with {previous['commit']} ({previous['timestamp']})")
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Synthetic 'full dataset' sheets of any size, for benchmarking.
+
+`synthetic_full_dataset` draws every column of `FULL_DATASET_SCHEMA` with
+roughly the paper's proportions, and keeps the columns consistent with
+each other (the score category and bands follow the continuous score,
+healthy controls have no antibiotics or admission time), so every cohort
+and stratum of the real analysis is populated at every size.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from christina_paper.schema import FULL_DATASET_SCHEMA, FULL_DATASET_SHEET
+
+CACHE_DIR = Path(".cache") / "benchmarks"
+
+# Excel's row limit, minus the header row
+XLSX_MAX_ROWS = 1_048_575
+
+
+def synthetic_full_dataset(n_rows: int, seed: int = 0) -> pl.DataFrame:
+    """A 'full dataset' frame of ``n_rows`` patients with the pinned schema."""
+    rng = np.random.default_rng(seed)
+    control = rng.random(n_rows) < 0.04
+
+    # Antibiotics for >= 72 hours in ~75% of patients, mostly started within 48 hours
+    ab_72 = rng.random(n_rows) < 0.75
+    ab_48 = np.where(control, 2, (ab_72 & (rng.random(n_rows) < 0.97)).astype(np.uint8))
+
+    # Bacterial-managed patients mostly score high, the others spread out
+    score = np.where(
+        ab_72,
+        np.clip(rng.normal(80, 25, n_rows), 0, 100),
+        rng.uniform(0, 100, n_rows),
+    ).round().astype(np.uint8)
+    category = np.select([score >= 66, score <= 34], [1, 2], 3).astype(np.uint8)
+    bands = (np.searchsorted([10, 35, 65, 90], score, side="right") + 1).astype(np.uint8)
+
+    rti = rng.choice(np.array([1, 2, 3, 4], dtype=np.uint8), n_rows, p=[0.55, 0.16, 0.17, 0.12])
+    diagnosis = rng.choice(np.arange(1, 10, dtype=np.uint8), n_rows)
+    admission = (
+        np.datetime64("2020-09-01T00:00", "m")
+        + rng.integers(0, 2 * 365 * 24 * 60, n_rows).astype("timedelta64[m]")
+    ).astype("datetime64[ms]")
+
+    return pl.DataFrame({
+        "healthy_control": control.astype(np.uint8),
+        "AB 72t": np.where(ab_72 & ~control, "JA", "NEI"),
+        "Oppst AB 48t": ab_48,
+        "MeMed score category": category,
+        "RTi Category  FAP B or V (BV=B)": np.where(control, 4, rti),
+        "Score_Memed_intervals": bands,
+        "Score_Memed": score,
+        "UTDIAGN": np.where(control, 0, diagnosis),
+        "AGE": rng.integers(18, 100, n_rows).astype(np.uint8),
+        "SEX": rng.integers(0, 2, n_rows).astype(np.uint8),
+        "PITIDINNKOMST": admission,
+        "control": control,
+    }).with_columns(
+        # Admission time as text, "0" for healthy controls, as in the workbook
+        pl.when(pl.col("control"))
+        .then(pl.lit("0"))
+        .otherwise(pl.col("PITIDINNKOMST").dt.strftime("%Y-%m-%d %H:%M"))
+        .alias("PITIDINNKOMST")
+    ).drop("control").cast(dict(FULL_DATASET_SCHEMA))
+
+
+def synthetic_workbook(n_rows: int, seed: int = 0) -> Path:
+    """Path of an .xlsx workbook holding `synthetic_full_dataset`, written once.
+
+    openpyxl's write-only mode streams the rows, so memory stays flat, but
+    writing is slow; the workbook is kept under `CACHE_DIR` for later runs.
+    """
+    if n_rows > XLSX_MAX_ROWS:
+        raise ValueError(f"{n_rows:,} rows exceed the {XLSX_MAX_ROWS:,} rows an .xlsx sheet can hold")
+    path = CACHE_DIR / f"synthetic-{n_rows}-{seed}.xlsx"
+    if path.exists():
+        return path
+
+    import openpyxl
+
+    frame = synthetic_full_dataset(n_rows, seed).with_columns(pl.col("AB 72t").cast(pl.String))
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(FULL_DATASET_SHEET)
+    sheet.append(frame.columns)
+    for row in frame.iter_rows():
+        sheet.append(row)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    workbook.save(tmp)
+    tmp.replace(path)
+    return path
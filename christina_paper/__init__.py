@@ -0,0 +1 @@
+"""Reusable analysis code for the MeMed BV paper notebook (`data-analysis.py`)."""
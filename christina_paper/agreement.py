@@ -0,0 +1,173 @@
+"""PPA/NPA and descriptive proportions computed from the data.
+
+`agreement_metrics` turns the long contingency table of
+`christina_paper.cohorts.contingency_tables` into the PPA and NPA of every
+cohort, with equivocal MeMed results either included (counted as
+disagreement) or excluded, and Wilson CIs for all of them in one
+vectorized pass. `descriptive_proportions` does the same for the
+proportions quoted in the paper's descriptive tables, so no count has to
+be copied into the notebook by hand.
+"""
+
+from collections.abc import Mapping, Sequence
+
+import polars as pl
+
+from christina_paper.cohorts import (
+    BACTERIAL_MANAGEMENT,
+    BACTERIAL_SCORE,
+    COHORTS,
+    EQUIVOCAL_SCORE,
+    NO_DETECTION,
+    SCORE_CATEGORY,
+    VIRAL_MANAGEMENT,
+    VIRAL_SCORE,
+    Cohort,
+    clinical_management,
+    molecular_detection,
+)
+from christina_paper.intervals import wilson_interval_expr
+
+# How equivocal MeMed results enter the denominator
+EQUIVOCALS_INCLUDED = "included"
+EQUIVOCALS_EXCLUDED = "excluded"
+
+
+def _score_count(score: int) -> pl.Expr:
+    return pl.col("count").filter(pl.col(SCORE_CATEGORY) == score).sum()
+
+
+def agreement_metrics(
+    counts: pl.DataFrame,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    alpha: float = 0.05,
+    by: Sequence[str] = (),
+) -> pl.DataFrame:
+    """PPA and NPA of every cohort, with equivocals included and excluded.
+
+    ``counts`` is a `contingency_tables` result. The PPA is the share of the
+    cohort's positive (bacterial) reference group with a bacterial score,
+    the NPA the share of its negative group with a viral score. With
+    equivocals included they count as disagreement; with equivocals
+    excluded they are dropped from the denominator.
+
+    Returns one row per (cohort, metric, equivocals) with ``successes``,
+    ``total``, ``estimate``, ``ci_lower`` and ``ci_upper``. Columns of
+    ``counts`` named in ``by`` (e.g. strata) give one set of rows per
+    distinct combination of their values, nulls included.
+    """
+    specs = pl.DataFrame(
+        {
+            "cohort": [name for name in cohorts for _ in ("PPA", "NPA")],
+            "metric": [metric for _ in cohorts for metric in ("PPA", "NPA")],
+            "reference_group": [
+                group for c in cohorts.values() for group in (c.positive, c.negative)
+            ],
+        }
+    )
+    if by:
+        specs = counts.select(by).unique(maintain_order=True).join(specs, how="cross")
+    per_group = counts.group_by(*by, "cohort", "reference_group").agg(
+        bacterial=_score_count(BACTERIAL_SCORE),
+        viral=_score_count(VIRAL_SCORE),
+        equivocal=_score_count(EQUIVOCAL_SCORE),
+    )
+    metrics = specs.join(
+        per_group,
+        on=[*by, "cohort", "reference_group"],
+        how="left",
+        maintain_order="left",
+        nulls_equal=True,
+    ).with_columns(
+        pl.col("bacterial", "viral", "equivocal").fill_null(0),
+        # PPA agrees on a bacterial score, NPA on a viral score
+        successes=pl.when(pl.col("metric") == "PPA")
+        .then(pl.col("bacterial"))
+        .otherwise(pl.col("viral")),
+    )
+
+    return (
+        pl.concat(
+            [
+                metrics.with_columns(
+                    equivocals=pl.lit(EQUIVOCALS_INCLUDED),
+                    total=pl.col("bacterial") + pl.col("viral") + pl.col("equivocal"),
+                ),
+                metrics.with_columns(
+                    equivocals=pl.lit(EQUIVOCALS_EXCLUDED),
+                    total=pl.col("bacterial") + pl.col("viral"),
+                ),
+            ]
+        )
+        .with_columns(
+            estimate=pl.col("successes") / pl.col("total"),
+            *wilson_interval_expr("successes", "total", alpha),
+        )
+        .select(
+            *by, "cohort", "metric", "reference_group", "equivocals",
+            "successes", "total", "estimate", "ci_lower", "ci_upper",
+        )
+    )
+
+
+# --- Descriptive proportions quoted in the paper's tables ---
+# name -> (population, success); both boolean expressions over 'full dataset'
+_clinical = clinical_management()
+_bacterial_management = (_clinical == BACTERIAL_MANAGEMENT).fill_null(False)
+_viral_management = (_clinical == VIRAL_MANAGEMENT).fill_null(False)
+_high_likelihood_viral = pl.col("Score_Memed_intervals") == 1
+_moderate_likelihood_viral = pl.col("Score_Memed_intervals") == 2
+_bacterial_score = pl.col(SCORE_CATEGORY) == BACTERIAL_SCORE
+_non_infectious = pl.col("UTDIAGN").is_in([4, 5, 6, 8])
+_no_detection = (molecular_detection() == NO_DETECTION).fill_null(False)
+
+DESCRIPTIVE_PROPORTIONS: dict[str, tuple[pl.Expr, pl.Expr]] = {
+    # Table 1: high likelihood viral score, by management group
+    "table1_bacterial_high_viral": (_bacterial_management, _high_likelihood_viral),
+    "table1_viral_high_viral": (_viral_management, _high_likelihood_viral),
+    # Table 3: bacterial score among non-infectious patients managed as bacterial
+    "table3_bacterial_bacterial_score": (
+        _bacterial_management & _non_infectious,
+        _bacterial_score,
+    ),
+    # Supplementary Table 1: moderate likelihood viral score in healthy controls
+    "supp1_controls_moderate_viral": (
+        pl.col("healthy_control") == 1,
+        _moderate_likelihood_viral,
+    ),
+    # Supplementary Table 2: bacterial score among patients without molecular
+    # detections who were managed as bacterial
+    "supp2_bacterial_bacterial_score": (
+        _no_detection & _bacterial_management,
+        _bacterial_score,
+    ),
+}
+
+
+def descriptive_proportions(
+    frame: pl.DataFrame | pl.LazyFrame,
+    proportions: Mapping[str, tuple[pl.Expr, pl.Expr]] = DESCRIPTIVE_PROPORTIONS,
+    alpha: float = 0.05,
+) -> pl.DataFrame:
+    """Count every descriptive proportion in one pass and add Wilson CIs.
+
+    Returns one row per name with ``successes``, ``total``, ``estimate``,
+    ``ci_lower`` and ``ci_upper``.
+    """
+    sums = frame.lazy().select(
+        pl.struct(
+            successes=(population & success).sum(),
+            total=population.sum(),
+        ).alias(name)
+        for name, (population, success) in proportions.items()
+    )
+    return (
+        sums.unpivot(variable_name="name", value_name="counts")
+        .unnest("counts")
+        .with_columns(
+            estimate=pl.col("successes") / pl.col("total"),
+            *wilson_interval_expr("successes", "total", alpha),
+        )
+        .select("name", "successes", "total", "estimate", "ci_lower", "ci_upper")
+        .collect()
+    )
@@ -0,0 +1,194 @@
+"""Bootstrap confidence intervals for the PPA/NPA, including paired differences.
+
+Resampling patients with replacement only changes how many patients fall
+in each cell of the joint contingency table (`cohorts.joint_counts`), so a
+replicate is a single multinomial draw over those cell counts instead of a
+copy of the patient rows. All replicates are drawn as one (B x cells)
+array and every metric is a matrix product with 0/1 cell-selection
+vectors, so B = 100,000 replicates take well under a second.
+
+Because each replicate resamples the same patients for every cohort and
+equivocal policy, differences between metrics (with vs without
+equivocals, clinical vs molecular) are paired.
+"""
+
+import multiprocessing
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import polars as pl
+
+from christina_paper.agreement import EQUIVOCALS_EXCLUDED, EQUIVOCALS_INCLUDED
+from christina_paper.cohorts import (
+    BACTERIAL_SCORE,
+    COHORTS,
+    EQUIVOCAL_SCORE,
+    SCORE_CATEGORY,
+    VIRAL_SCORE,
+    Cohort,
+)
+
+# Replicates per random stream; fixed so results do not depend on n_jobs
+CHUNK_SIZE = 25_000
+
+
+def _metric_matrices(
+    joint: pl.DataFrame,
+    cohorts: Mapping[str, Cohort],
+) -> tuple[pl.DataFrame, np.ndarray, np.ndarray, np.ndarray]:
+    # Patients outside every cohort never enter a metric
+    joint = joint.filter(pl.any_horizontal(pl.col(list(cohorts)).is_not_null()))
+
+    # One column per metric: which joint cells count as successes / in the total
+    specs, successes, totals = [], [], []
+    score = pl.col(SCORE_CATEGORY)
+    for name, spec in cohorts.items():
+        for metric, group, agree in (
+            ("PPA", spec.positive, BACTERIAL_SCORE),
+            ("NPA", spec.negative, VIRAL_SCORE),
+        ):
+            in_group = (pl.col(name) == group).fill_null(False)
+            for equivocals in (EQUIVOCALS_INCLUDED, EQUIVOCALS_EXCLUDED):
+                in_total = in_group
+                if equivocals == EQUIVOCALS_EXCLUDED:
+                    in_total = in_total & (score != EQUIVOCAL_SCORE)
+                specs.append((name, metric, equivocals))
+                totals.append(joint.select(in_total).to_series().to_numpy())
+                successes.append(joint.select(in_total & (score == agree)).to_series().to_numpy())
+
+    return (
+        pl.DataFrame(specs, schema=["cohort", "metric", "equivocals"], orient="row"),
+        joint["count"].to_numpy().astype(np.float64),
+        np.column_stack(successes).astype(np.float64),
+        np.column_stack(totals).astype(np.float64),
+    )
+
+
+def _draw_estimates(
+    seed: np.random.SeedSequence,
+    size: int,
+    n_patients: int,
+    probabilities: np.ndarray,
+    successes: np.ndarray,
+    totals: np.ndarray,
+) -> np.ndarray:
+    # (size x cells) resampled cell counts -> (size x metrics) estimates
+    rng = np.random.default_rng(seed)
+    draws = rng.multinomial(n_patients, probabilities, size=size).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (draws @ successes) / (draws @ totals)
+
+
+def _replicates(
+    counts: np.ndarray,
+    successes: np.ndarray,
+    totals: np.ndarray,
+    replicates: int,
+    seed: int,
+    n_jobs: int,
+) -> np.ndarray:
+    n_patients = int(counts.sum())
+    probabilities = counts / n_patients
+
+    sizes = [CHUNK_SIZE] * (replicates // CHUNK_SIZE)
+    if replicates % CHUNK_SIZE:
+        sizes.append(replicates % CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(s, size, n_patients, probabilities, successes, totals) for s, size in zip(seeds, sizes)]
+
+    if n_jobs == 1:
+        chunks = [_draw_estimates(*a) for a in args]
+    else:
+        # Spawned, not forked: the notebook has already started polars'
+        # thread pool, and a forked child can deadlock on it
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=spawn) as pool:
+            chunks = list(pool.map(_draw_estimates, *zip(*args)))
+    return np.concatenate(chunks)
+
+
+def bootstrap_replicates(
+    joint: pl.DataFrame,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    replicates: int = 100_000,
+    seed: int = 0,
+    n_jobs: int = 1,
+) -> tuple[pl.DataFrame, np.ndarray]:
+    """Draw bootstrap replicates of every PPA/NPA variant.
+
+    ``joint`` is a collected `joint_counts` result. Replicates are drawn in
+    chunks of `CHUNK_SIZE` from independent streams spawned from ``seed``;
+    with ``n_jobs > 1`` the chunks run on a process pool. Returns the metric
+    specs (one row per column) and the ``(replicates x metrics)`` array of
+    estimates.
+    """
+    specs, counts, successes, totals = _metric_matrices(joint, cohorts)
+    return specs, _replicates(counts, successes, totals, replicates, seed, n_jobs)
+
+
+def _percentile_interval(estimates: np.ndarray, alpha: float) -> tuple[np.ndarray, np.ndarray]:
+    lower, upper = np.nanquantile(estimates, [alpha / 2, 1 - alpha / 2], axis=0)
+    return lower, upper
+
+
+def bootstrap_agreement(
+    joint: pl.DataFrame,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    replicates: int = 100_000,
+    alpha: float = 0.05,
+    seed: int = 0,
+    n_jobs: int = 1,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Percentile bootstrap CIs for every PPA/NPA and their paired differences.
+
+    Returns two frames. The first has one row per (cohort, metric,
+    equivocals) with the observed ``estimate`` and ``ci_lower``/``ci_upper``.
+    The second has the paired differences "equivocals included minus
+    excluded" (per cohort and metric) and, for every pair of cohorts,
+    "first cohort minus second" (per metric and equivocal policy).
+    """
+    specs, counts, successes, totals = _metric_matrices(joint, cohorts)
+    estimates = _replicates(counts, successes, totals, replicates, seed, n_jobs)
+    observed = (counts @ successes) / (counts @ totals)
+
+    lower, upper = _percentile_interval(estimates, alpha)
+    metrics = specs.with_columns(
+        estimate=pl.Series(observed),
+        ci_lower=pl.Series(lower),
+        ci_upper=pl.Series(upper),
+    )
+
+    # Pairs of metric columns to difference
+    keys = {row: i for i, row in enumerate(specs.iter_rows())}
+    pairs = []
+    names = list(cohorts)
+    for name in names:
+        for metric in ("PPA", "NPA"):
+            pairs.append((
+                f"{name} {metric}: equivocals included - excluded",
+                keys[(name, metric, EQUIVOCALS_INCLUDED)],
+                keys[(name, metric, EQUIVOCALS_EXCLUDED)],
+            ))
+    for i, first in enumerate(names):
+        for second in names[i + 1:]:
+            for metric in ("PPA", "NPA"):
+                for equivocals in (EQUIVOCALS_INCLUDED, EQUIVOCALS_EXCLUDED):
+                    pairs.append((
+                        f"{metric} (equivocals {equivocals}): {first} - {second}",
+                        keys[(first, metric, equivocals)],
+                        keys[(second, metric, equivocals)],
+                    ))
+
+    first_idx = np.array([a for _, a, _ in pairs])
+    second_idx = np.array([b for _, _, b in pairs])
+    diff_lower, diff_upper = _percentile_interval(
+        estimates[:, first_idx] - estimates[:, second_idx], alpha
+    )
+    differences = pl.DataFrame({
+        "comparison": [label for label, _, _ in pairs],
+        "difference": observed[first_idx] - observed[second_idx],
+        "ci_lower": diff_lower,
+        "ci_upper": diff_upper,
+    })
+    return metrics, differences
@@ -0,0 +1,122 @@
+"""On-disk Arrow IPC cache of the parsed Excel workbook.
+
+XLSX is the slowest format polars reads, so the first load of a workbook
+writes every parsed sheet to an uncompressed Arrow IPC file. Later loads
+memory-map those files instead of parsing the workbook again. Entries are
+keyed by the workbook's content hash and modification time, so any change
+to the file lands in a new entry and the old one is simply never read.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from collections.abc import Mapping
+from pathlib import Path
+
+import polars as pl
+
+from christina_paper.workbook import SheetInfo, list_sheets, load_workbook
+
+DEFAULT_CACHE_DIR = Path(".cache") / "workbooks"
+
+
+def workbook_cache_key(excel_file_path: str | Path) -> str:
+    """Cache key built from the workbook's SHA-256 content hash and mtime."""
+    path = Path(excel_file_path)
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return f"{digest.hexdigest()[:32]}-{path.stat().st_mtime_ns}"
+
+
+def _entry_dir(excel_file_path: str | Path, cache_dir: str | Path) -> Path:
+    return Path(cache_dir) / workbook_cache_key(excel_file_path)
+
+
+def _sheet_file(
+    entry: Path,
+    sheet_name: str,
+    schema: Mapping[str, pl.DataType] | None = None,
+    optional: Mapping[str, pl.DataType] | None = None,
+) -> Path:
+    # Sheet names may contain characters that are not valid in file names.
+    # A pinned schema is part of the name so changing it invalidates the file.
+    parts = [sheet_name, sorted((name, str(dtype)) for name, dtype in (schema or {}).items())]
+    if optional:
+        parts.append(sorted((name, str(dtype)) for name, dtype in optional.items()))
+    key = repr(tuple(parts))
+    return entry / f"{hashlib.sha1(key.encode()).hexdigest()[:16]}.arrow"
+
+
+def _write_atomic(path: Path, write) -> None:
+    # Write to a temporary file first so a crash never leaves a half-written entry.
+    # The name is unique per writer: spawned workers fill the same entry at once.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    os.close(fd)
+    tmp = Path(tmp)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except OSError:
+        # Another worker finished the same entry first; its file is complete
+        if not path.exists():
+            raise
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def list_sheets_cached(
+    excel_file_path: str | Path,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+) -> list[SheetInfo]:
+    """`list_sheets`, answered from the cache when the workbook is unchanged."""
+    entry = _entry_dir(excel_file_path, cache_dir)
+    manifest = entry / "sheets.json"
+    if manifest.exists():
+        return [SheetInfo(*info) for info in json.loads(manifest.read_text())]
+
+    sheet_infos = list_sheets(excel_file_path)
+    entry.mkdir(parents=True, exist_ok=True)
+    _write_atomic(manifest, lambda tmp: tmp.write_text(json.dumps(sheet_infos)))
+    return sheet_infos
+
+
+def load_workbook_cached(
+    excel_file_path: str | Path,
+    sheet_names: list[str] | None = None,
+    schemas: Mapping[str, Mapping[str, pl.DataType]] | None = None,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+    optional_schemas: Mapping[str, Mapping[str, pl.DataType]] | None = None,
+) -> dict[str, pl.DataFrame]:
+    """`load_workbook`, served from memory-mapped Arrow IPC files when cached.
+
+    Only the sheets missing from the cache entry are parsed (in one pass);
+    they are written back so the next run can memory-map them.
+    """
+    schemas = schemas or {}
+    optional_schemas = optional_schemas or {}
+    entry = _entry_dir(excel_file_path, cache_dir)
+    if sheet_names is None:
+        sheet_names = [info.name for info in list_sheets_cached(excel_file_path, cache_dir)]
+    files = {
+        name: _sheet_file(entry, name, schemas.get(name), optional_schemas.get(name))
+        for name in sheet_names
+    }
+
+    missing = [name for name in sheet_names if not files[name].exists()]
+    if missing:
+        parsed = load_workbook(
+            excel_file_path, sheet_names=missing, schemas=schemas, optional_schemas=optional_schemas
+        )
+        entry.mkdir(parents=True, exist_ok=True)
+        for name, frame in parsed.items():
+            # Uncompressed IPC so the file can be memory-mapped zero-copy
+            _write_atomic(
+                files[name],
+                lambda tmp, frame=frame: frame.write_ipc(tmp, compression="uncompressed"),
+            )
+
+    # polars memory-maps uncompressed IPC files when reading from a path
+    return {name: pl.read_ipc(files[name]) for name in sheet_names}
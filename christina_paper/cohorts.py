@@ -0,0 +1,183 @@
+"""Cohort definitions as lazy polars expressions.
+
+Each cohort is a single expression that labels every patient with their
+reference-standard group, or null if they are outside the cohort. The
+cohort and its contingency table are then built from one lazy query, so
+polars can push the predicate and the column selection down into the scan
+and works the same over an in-memory frame or `pl.scan_parquet`.
+
+`COHORTS` registers every cohort the paper reports. `contingency_tables`
+counts all of them with a single ``group_by`` over one pass of the data, so
+adding another reference standard is one more registry entry rather than
+another scan.
+"""
+
+from collections.abc import Mapping, Sequence
+from typing import NamedTuple
+
+import polars as pl
+
+SCORE_CATEGORY = "MeMed score category"
+
+# MeMed score category codes
+BACTERIAL_SCORE = 1
+VIRAL_SCORE = 2
+EQUIVOCAL_SCORE = 3
+
+# --- Clinical management cohort ---
+CLINICAL_MANAGEMENT = "Clinical_management"
+BACTERIAL_MANAGEMENT = "Bacterial management"
+VIRAL_MANAGEMENT = "Viral/non-bacterial management"
+
+
+def clinical_management() -> pl.Expr:
+    """Label each patient by clinical management, null if not in the cohort.
+
+    Bacterial management: antibiotics for 72 hours or more, started within
+    48 hours. Viral/non-bacterial management: antibiotics for less than 72
+    hours. Healthy controls are excluded.
+    """
+    not_control = pl.col("healthy_control") == 0
+    return (
+        pl.when(not_control & (pl.col("AB 72t") == "JA") & (pl.col("Oppst AB 48t") == 1))
+        .then(pl.lit(BACTERIAL_MANAGEMENT))
+        .when(not_control & (pl.col("AB 72t") == "NEI"))
+        .then(pl.lit(VIRAL_MANAGEMENT))
+        .alias(CLINICAL_MANAGEMENT)
+    )
+
+
+# --- Molecular detection cohort ---
+MOLECULAR_DETECTION = "Molecular_Detection"
+BACTERIAL_DETECTIONS = "Bacterial detections"
+VIRAL_DETECTIONS = "Viral detections"
+NO_DETECTION = "No detection"
+
+
+def molecular_detection() -> pl.Expr:
+    """Label each patient by molecular test result, null if not in the cohort.
+
+    Uses the RTi category (1 = bacterial, 2 = viral, 3 = nothing detected);
+    patients without a molecular test (4) and healthy controls are excluded.
+    """
+    rti = pl.col("RTi Category  FAP B or V (BV=B)")
+    return (
+        pl.when(pl.col("healthy_control") != 0)
+        .then(pl.lit(None, dtype=pl.String))
+        .when(rti == 1)
+        .then(pl.lit(BACTERIAL_DETECTIONS))
+        .when(rti == 2)
+        .then(pl.lit(VIRAL_DETECTIONS))
+        .when(rti == 3)
+        .then(pl.lit(NO_DETECTION))
+        .alias(MOLECULAR_DETECTION)
+    )
+
+
+class Cohort(NamedTuple):
+    """A cohort and the reference standard its MeMed scores are compared to."""
+
+    # Reference-standard label, null for patients outside the cohort
+    label: pl.Expr
+    # Reference group used for the PPA (bacterial) and the NPA (viral)
+    positive: str
+    negative: str
+
+    @property
+    def column(self) -> str:
+        return self.label.meta.output_name()
+
+
+COHORTS: dict[str, Cohort] = {
+    "clinical": Cohort(clinical_management(), BACTERIAL_MANAGEMENT, VIRAL_MANAGEMENT),
+    "molecular": Cohort(molecular_detection(), BACTERIAL_DETECTIONS, VIRAL_DETECTIONS),
+}
+
+
+def cohort(frame: pl.DataFrame | pl.LazyFrame, label: pl.Expr) -> pl.LazyFrame:
+    """Patients with a non-null ``label``, with the label added as a column."""
+    name = label.meta.output_name()
+    return frame.lazy().with_columns(label).filter(pl.col(name).is_not_null())
+
+
+def joint_counts(
+    frame: pl.DataFrame | pl.LazyFrame,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    by: Sequence[pl.Expr] = (),
+) -> pl.LazyFrame:
+    """Count patients per combination of every cohort's label and the score.
+
+    One ``group_by`` over a single pass of the data. The result has one
+    column per cohort name (its reference group, null outside the cohort)
+    and is tiny: at most the product of the group sizes. Expressions in
+    ``by`` (e.g. stratification variables) are added to the grouping keys.
+    """
+    labels = [c.label.alias(name) for name, c in cohorts.items()]
+    return (
+        frame.lazy()
+        .group_by(*by, *labels, SCORE_CATEGORY)
+        .agg(pl.len().alias("count"))
+    )
+
+
+def contingency_tables(
+    frame: pl.DataFrame | pl.LazyFrame,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+) -> pl.DataFrame:
+    """Long contingency table of every cohort, from one scan of ``frame``.
+
+    Columns: ``cohort``, ``reference_group``, ``MeMed score category`` and
+    ``count``. The per-cohort tables are marginals of `joint_counts`.
+    """
+    return marginal_tables(joint_counts(frame, cohorts), cohorts).collect()
+
+
+def marginal_tables(
+    joint: pl.DataFrame | pl.LazyFrame,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    by: Sequence[str] = (),
+) -> pl.LazyFrame:
+    """Long per-cohort contingency tables from a `joint_counts` table.
+
+    Columns named in ``by`` are kept as leading keys; any other extra
+    grouping columns of ``joint`` are summed over.
+    """
+    return (
+        joint.lazy()
+        .unpivot(
+            index=[*by, SCORE_CATEGORY, "count"],
+            on=list(cohorts),
+            variable_name="cohort",
+            value_name="reference_group",
+        )
+        .drop_nulls("reference_group")
+        .group_by(*by, "cohort", "reference_group", SCORE_CATEGORY)
+        .agg(pl.col("count").sum())
+        .sort(*by, "cohort", "reference_group", SCORE_CATEGORY, nulls_last=True)
+    )
+
+
+def cohort_size(counts: pl.DataFrame, name: str) -> int:
+    """Number of patients in cohort ``name`` of a `contingency_tables` result."""
+    return counts.filter(pl.col("cohort") == name)["count"].sum()
+
+
+def cohort_contingency(
+    counts: pl.DataFrame,
+    name: str,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+) -> pl.DataFrame:
+    """The PPA/NPA contingency table of one cohort.
+
+    Keeps only the positive and negative reference groups, named after the
+    cohort's label column (e.g. ``Clinical_management``).
+    """
+    spec = cohorts[name]
+    return (
+        counts.filter(
+            (pl.col("cohort") == name)
+            & pl.col("reference_group").is_in([spec.positive, spec.negative])
+        )
+        .drop("cohort")
+        .rename({"reference_group": spec.column})
+    )
@@ -0,0 +1,66 @@
+"""Arrow IPC export of the computed tables, for downstream consumers.
+
+The notebook's results are numeric polars tables (`agreement`,
+`cohort_counts`, ...). `write_tables` stores each one as an uncompressed
+Arrow IPC file, ``<name>.arrow``. Uncompressed IPC files hold the Arrow
+buffers exactly as they are laid out in memory, so a reader can
+memory-map them and use the columns without copying or parsing:
+
+    pl.read_ipc("results/arrow/agreement.arrow")           # polars
+    pa.ipc.open_file(pa.memory_map("agreement.arrow"))      # pyarrow
+
+A dashboard then reads the numbers in microseconds instead of re-running
+the notebook. Formatting (percentages, CI strings) is left to the reader;
+`christina_paper.presentation` holds the notebook's own formatting.
+"""
+
+from collections.abc import Mapping
+from pathlib import Path
+
+import polars as pl
+
+from christina_paper.cache import _write_atomic
+from christina_paper.cohorts import COHORTS, Cohort, cohort
+
+# Notebook outputs exported by a headless run
+EXPORTED_TABLES = (
+    "cohort_counts",
+    "agreement",
+    "equivocal_policies",
+    "descriptive",
+    "descriptive_exact",
+    "subgroup_agreement",
+    "roc_curves",
+    "roc_aucs",
+)
+
+
+def cohort_frames(
+    frame: pl.DataFrame | pl.LazyFrame,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+) -> dict[str, pl.DataFrame]:
+    """The patients of every cohort, with their label column, keyed ``cohort_<name>``."""
+    names = [f"cohort_{name}" for name in cohorts]
+    frames = pl.collect_all([cohort(frame, c.label) for c in cohorts.values()])
+    return dict(zip(names, frames))
+
+
+def write_tables(tables: Mapping[str, pl.DataFrame], out_dir: str | Path) -> list[Path]:
+    """Write each table to ``out_dir/<name>.arrow``, uncompressed.
+
+    Files are replaced atomically, so a reader that has one mapped keeps
+    seeing a complete table.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, table in tables.items():
+        path = out_dir / f"{name}.arrow"
+        _write_atomic(path, lambda tmp, table=table: table.write_ipc(tmp, compression="uncompressed"))
+        paths.append(path)
+    return paths
+
+
+def read_tables(out_dir: str | Path) -> dict[str, pl.DataFrame]:
+    """Every ``.arrow`` table in ``out_dir``, keyed by name, memory-mapped by polars."""
+    return {path.stem: pl.read_ipc(path) for path in sorted(Path(out_dir).glob("*.arrow"))}
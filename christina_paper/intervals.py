@@ -0,0 +1,223 @@
+"""Confidence intervals for proportions, vectorized over many strata.
+
+`wilson_interval` takes scalars or arrays of counts and totals and returns
+the lower and upper bounds in one NumPy call; `wilson_interval_expr` does
+the same as polars expressions, so intervals can be attached to a whole
+contingency table with ``with_columns``. Both match
+``statsmodels.stats.proportion.proportion_confint(..., method="wilson")``.
+
+`proportion_interval` adds the exact Clopper-Pearson and mid-p intervals,
+which are preferable for the small denominators of the descriptive tables.
+For every (k, n) with n <= `TABLE_MAX_N` they are looked up in a
+precomputed table that is persisted under `TABLE_DIR` and memoized in
+memory, so a small-n interval costs one array index; larger n falls back
+to a vectorized computation.
+"""
+
+import functools
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+import numpy.typing as npt
+import polars as pl
+
+METHODS = ("wilson", "clopper-pearson", "mid-p")
+
+# Exact intervals for n up to this bound are served from a lookup table
+TABLE_MAX_N = 500
+TABLE_DIR = Path(".cache") / "intervals"
+
+
+def _critical_value(alpha: float) -> float:
+    # Two-sided standard normal quantile, e.g. 1.96 for alpha = 0.05
+    return NormalDist().inv_cdf(1 - alpha / 2)
+
+
+def wilson_interval(
+    count: npt.ArrayLike,
+    nobs: npt.ArrayLike,
+    alpha: float = 0.05,
+) -> tuple[np.ndarray | float, np.ndarray | float]:
+    """Wilson score interval for ``count`` successes out of ``nobs``.
+
+    Accepts scalars or arrays (broadcast against each other) and returns
+    ``(lower, upper)`` of the same shape; plain floats for scalar input.
+    """
+    count = np.asarray(count, dtype=np.float64)
+    nobs = np.asarray(nobs, dtype=np.float64)
+    crit = _critical_value(alpha)
+    crit2 = crit**2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        q = count / nobs
+        denom = 1 + crit2 / nobs
+        center = (q + crit2 / (2 * nobs)) / denom
+        dist = crit * np.sqrt(q * (1 - q) / nobs + crit2 / (4 * nobs**2)) / denom
+
+    lower, upper = center - dist, center + dist
+    if lower.ndim == 0:
+        return float(lower), float(upper)
+    return lower, upper
+
+
+def wilson_interval_expr(
+    count: str | pl.Expr,
+    nobs: str | pl.Expr,
+    alpha: float = 0.05,
+) -> tuple[pl.Expr, pl.Expr]:
+    """`wilson_interval` as polars expressions named ``ci_lower``/``ci_upper``.
+
+    ``count`` and ``nobs`` are column names or expressions, e.g.
+    ``table.with_columns(*wilson_interval_expr("successes", "total"))``.
+    """
+    count = pl.col(count) if isinstance(count, str) else count
+    nobs = pl.col(nobs) if isinstance(nobs, str) else nobs
+    count = count.cast(pl.Float64)
+    nobs = nobs.cast(pl.Float64)
+    crit = _critical_value(alpha)
+    crit2 = crit**2
+
+    q = count / nobs
+    denom = 1 + crit2 / nobs
+    center = (q + crit2 / (2 * nobs)) / denom
+    dist = crit * (q * (1 - q) / nobs + crit2 / (4 * nobs**2)).sqrt() / denom
+    return (center - dist).alias("ci_lower"), (center + dist).alias("ci_upper")
+
+
+# --- Exact intervals ---
+
+def _clopper_pearson(
+    count: np.ndarray,
+    nobs: np.ndarray,
+    alpha: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Beta quantiles; scipy.special is imported here as it is slow to import
+    from scipy.special import betaincinv
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lower = np.where(count > 0, betaincinv(count, nobs - count + 1, alpha / 2), 0.0)
+        upper = np.where(count < nobs, betaincinv(count + 1, nobs - count, 1 - alpha / 2), 1.0)
+    return lower, upper
+
+
+def _mid_p(
+    count: np.ndarray,
+    nobs: np.ndarray,
+    alpha: float,
+    tol: float = 1e-14,
+    max_iterations: int = 100,
+) -> tuple[np.ndarray, np.ndarray]:
+    from scipy.special import betainc
+
+    def upper_tail(p, k, n):
+        # P(X > k) + P(X = k) / 2 for X ~ Binomial(n, p), increasing in p
+        with np.errstate(divide="ignore", invalid="ignore"):
+            at_least = np.where(k > 0, betainc(k, n - k + 1, p), 1.0)
+            above = np.where(k < n, betainc(k + 1, n - k, p), 0.0)
+        return (at_least + above) / 2
+
+    def solve(target, lo, hi):
+        # Vectorized Illinois (modified regula falsi) for upper_tail(p) == target,
+        # iterating only over the entries that have not converged yet
+        lo, hi = lo.copy(), hi.copy()
+        f_lo = upper_tail(lo, count, nobs) - target
+        f_hi = upper_tail(hi, count, nobs) - target
+        side = np.zeros(lo.shape, dtype=np.int8)
+        active = np.flatnonzero(hi - lo > tol)
+        for _ in range(max_iterations):
+            if active.size == 0:
+                break
+            a_lo, a_hi, a_flo, a_fhi = lo[active], hi[active], f_lo[active], f_hi[active]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                p = (a_lo * a_fhi - a_hi * a_flo) / (a_fhi - a_flo)
+            p = np.where(np.isfinite(p) & (p > a_lo) & (p < a_hi), p, (a_lo + a_hi) / 2)
+            f = upper_tail(p, count[active], nobs[active]) - target
+            below = f < 0
+            # Halve the stale endpoint's residual when the same side moves twice
+            stale = side[active]
+            f_hi[active] = np.where(below, np.where(stale == -1, a_fhi / 2, a_fhi), f)
+            f_lo[active] = np.where(below, f, np.where(stale == 1, a_flo / 2, a_flo))
+            lo[active] = np.where(below, p, a_lo)
+            hi[active] = np.where(below, a_hi, p)
+            side[active] = np.where(below, -1, 1)
+            converged = (np.abs(f) <= tol) | (hi[active] - lo[active] <= tol)
+            lo[active[converged]] = hi[active[converged]] = p[converged]
+            active = active[~converged]
+        return (lo + hi) / 2
+
+    # The mid-p bounds lie between the Clopper-Pearson bounds and k / n
+    cp_lower, cp_upper = _clopper_pearson(count, nobs, alpha)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        estimate = count / nobs
+    lower = np.where(count > 0, solve(alpha / 2, cp_lower, estimate), 0.0)
+    upper = np.where(count < nobs, solve(1 - alpha / 2, estimate, cp_upper), 1.0)
+    return lower, upper
+
+
+_EXACT = {"clopper-pearson": _clopper_pearson, "mid-p": _mid_p}
+
+
+@functools.cache
+def _lookup_table(method: str, alpha: float) -> np.ndarray:
+    """(2, entries) array of exact bounds for every 0 <= k <= n <= TABLE_MAX_N.
+
+    The bounds for (k, n) are at index n * (n + 1) / 2 + k.
+    """
+    path = TABLE_DIR / f"{method}-alpha{alpha:g}-n{TABLE_MAX_N}.npy"
+    if path.exists():
+        return np.load(path)
+
+    n = np.repeat(np.arange(TABLE_MAX_N + 1), np.arange(1, TABLE_MAX_N + 2)).astype(np.float64)
+    k = np.concatenate([np.arange(m + 1) for m in range(TABLE_MAX_N + 1)]).astype(np.float64)
+    table = np.stack(_EXACT[method](k, n, alpha))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.stem + ".tmp.npy")
+    np.save(tmp, table)
+    tmp.replace(path)
+    return table
+
+
+def proportion_interval(
+    count: npt.ArrayLike,
+    nobs: npt.ArrayLike,
+    alpha: float = 0.05,
+    method: str = "wilson",
+) -> tuple[np.ndarray | float, np.ndarray | float]:
+    """Confidence interval for ``count`` successes out of ``nobs``.
+
+    ``method`` is one of `METHODS`: ``"wilson"``, ``"clopper-pearson"``
+    (exact) or ``"mid-p"`` (exact, mid-p corrected). Like `wilson_interval`
+    it accepts scalars or arrays and returns ``(lower, upper)``.
+    """
+    if method == "wilson":
+        return wilson_interval(count, nobs, alpha)
+    if method not in _EXACT:
+        raise ValueError(f"Unknown interval method {method!r}; expected one of {METHODS}")
+
+    count, nobs = np.broadcast_arrays(
+        np.asarray(count, dtype=np.float64), np.asarray(nobs, dtype=np.float64)
+    )
+    lower = np.full(count.shape, np.nan)
+    upper = np.full(count.shape, np.nan)
+
+    # Small integer (k, n): one lookup in the precomputed table
+    small = (nobs <= TABLE_MAX_N) & (count == np.floor(count)) & (nobs == np.floor(nobs))
+    small &= (count >= 0) & (count <= nobs)
+    if small.any():
+        table = _lookup_table(method, alpha)
+        k = count[small].astype(np.int64)
+        n = nobs[small].astype(np.int64)
+        index = n * (n + 1) // 2 + k
+        lower[small] = table[0, index]
+        upper[small] = table[1, index]
+
+    # Everything else: vectorized beta quantiles / bisection
+    rest = ~small & (nobs > 0)
+    if rest.any():
+        lower[rest], upper[rest] = _EXACT[method](count[rest], nobs[rest], alpha)
+
+    if lower.ndim == 0:
+        return float(lower), float(upper)
+    return lower, upper
@@ -0,0 +1,86 @@
+"""Forest plot of the confidence intervals the notebook computes, with Altair.
+
+Altair embeds the chart's data in the Vega-Lite JSON, row by row. The
+plot is therefore fed only summarised points: `forest_points` stacks the
+already-aggregated interval tables (`agreement`, `subgroup_agreement`,
+...) into one row per interval, keeps just the columns the chart draws
+and rounds the numbers. The chart itself has no transforms, so nothing is
+computed in the browser and VegaFusion is not needed; the spec grows with
+the number of intervals, never with the number of patients.
+
+The points are embedded as one CSV string rather than a list of records:
+it is about half the size (no repeated keys), and Altair validates a
+string at once instead of every record against the Vega-Lite schema,
+which took seconds for a few thousand intervals.
+"""
+
+from collections.abc import Mapping
+
+import polars as pl
+
+# Text columns that do not help tell intervals apart: the reference group
+# follows from the metric, and the grouping set from the non-null strata
+_UNLABELLED = ("metric", "reference_group", "grouping")
+
+
+def _label_columns(table: pl.DataFrame) -> list[str]:
+    return [
+        name
+        for name, dtype in table.schema.items()
+        if (dtype == pl.String or isinstance(dtype, (pl.Enum, pl.Categorical)))
+        and name not in _UNLABELLED
+    ]
+
+
+def forest_points(tables: Mapping[str, pl.DataFrame], decimals: int = 4) -> pl.DataFrame:
+    """One row per interval of ``tables``, keyed by section name.
+
+    Each table needs ``estimate``, ``ci_lower``, ``ci_upper`` and
+    ``total``. Its text columns (except `_UNLABELLED`) are joined into the
+    ``label``; ``metric`` is taken from the table, or ``"proportion"``.
+    """
+    points = []
+    for section, table in tables.items():
+        metric = pl.col("metric") if "metric" in table.columns else pl.lit("proportion")
+        points.append(
+            table.select(
+                pl.lit(section).alias("section"),
+                pl.concat_str(
+                    [pl.col(c).cast(pl.String) for c in _label_columns(table)],
+                    separator=", ",
+                    ignore_nulls=True,
+                ).alias("label"),
+                metric.alias("metric"),
+                pl.col("estimate", "ci_lower", "ci_upper").round(decimals),
+                pl.col("total").cast(pl.Float64).round(1),
+            )
+        )
+    return pl.concat(points)
+
+
+def forest_plot(points: pl.DataFrame, width: int = 300):
+    """Altair forest plot of `forest_points`: one panel per section and metric."""
+    import altair as alt
+
+    numeric = {name: "number" for name in ("estimate", "ci_lower", "ci_upper", "total")}
+    data = alt.InlineData(values=points.write_csv(), format=alt.CsvDataFormat(type="csv", parse=numeric))
+    base = alt.Chart().encode(
+        y=alt.Y("label:N", sort=None, title=None),
+        tooltip=[
+            "section:N", "label:N", "metric:N",
+            alt.Tooltip("estimate:Q", format=".1%"),
+            alt.Tooltip("ci_lower:Q", format=".1%"),
+            alt.Tooltip("ci_upper:Q", format=".1%"),
+            "total:Q",
+        ],
+    )
+    x = alt.X("ci_lower:Q", scale=alt.Scale(domain=[0, 1]), axis=alt.Axis(format="%"), title="Estimate (95% CI)")
+    intervals = base.mark_rule().encode(x=x, x2="ci_upper:Q")
+    estimates = base.mark_point(filled=True, color="black").encode(x="estimate:Q")
+
+    return (
+        alt.layer(intervals, estimates, data=data)
+        .properties(width=width)
+        .facet(row=alt.Row("section:N", title=None), column=alt.Column("metric:N", title=None))
+        .resolve_scale(y="independent")
+    )
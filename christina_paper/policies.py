@@ -0,0 +1,126 @@
+"""PPA/NPA under any number of equivocal-handling policies at once.
+
+The counts of every cohort are held as one dense tensor ``C[cohort,
+reference group, score category]`` (groups: positive then negative;
+scores: bacterial, viral, equivocal). A policy is one row of
+`POLICY_WEIGHTS`: the weight an equivocal result gets in the PPA's and
+the NPA's successes and total. Bacterial and viral scores always count
+as agreement with their own group and as disagreement with the other.
+The rows are expanded into ``W[policy, metric, quantity, score]``, and a
+single ``einsum`` gives the successes and totals of every policy, cohort
+and metric; the Wilson CIs follow in one vectorized call.
+
+Adding a policy is one more entry in `POLICY_WEIGHTS`.
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+import polars as pl
+
+from christina_paper.cohorts import (
+    BACTERIAL_SCORE,
+    COHORTS,
+    EQUIVOCAL_SCORE,
+    SCORE_CATEGORY,
+    VIRAL_SCORE,
+    Cohort,
+)
+from christina_paper.intervals import wilson_interval
+
+METRICS = ("PPA", "NPA")
+SCORES = (BACTERIAL_SCORE, VIRAL_SCORE, EQUIVOCAL_SCORE)
+
+# Weight of an equivocal result in:
+# (PPA successes, PPA total, NPA successes, NPA total)
+POLICY_WEIGHTS: dict[str, tuple[float, float, float, float]] = {
+    # Counted as disagreement: the worst case for both metrics
+    "included": (0, 1, 0, 1),
+    "excluded": (0, 0, 0, 0),
+    # Read as a bacterial call: agrees with the PPA, disagrees with the NPA
+    "as_positive": (1, 1, 0, 1),
+    # Read as a viral call
+    "as_negative": (0, 1, 1, 1),
+    # Half a bacterial and half a viral call
+    "split": (0.5, 1, 0.5, 1),
+    # Counted as agreement for both metrics
+    "best_case": (1, 1, 1, 1),
+}
+
+
+def count_tensor(
+    counts: pl.DataFrame,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+) -> np.ndarray:
+    """``C[cohort, group, score]`` from a `contingency_tables` result.
+
+    Axis 1 holds each cohort's positive then negative reference group,
+    axis 2 the `SCORES` in order; absent combinations are 0.
+    """
+    groups = pl.DataFrame({
+        "cohort": [name for name in cohorts for _ in range(2)],
+        "reference_group": [g for c in cohorts.values() for g in (c.positive, c.negative)],
+        "group": list(range(2)) * len(cohorts),
+        "cohort_index": [i for i in range(len(cohorts)) for _ in range(2)],
+    })
+    cells = counts.join(groups, on=["cohort", "reference_group"]).filter(
+        pl.col(SCORE_CATEGORY).is_in(SCORES)
+    )
+    tensor = np.zeros((len(cohorts), 2, len(SCORES)), dtype=np.float64)
+    np.add.at(
+        tensor,
+        (
+            cells["cohort_index"].to_numpy(),
+            cells["group"].to_numpy(),
+            np.searchsorted(SCORES, cells[SCORE_CATEGORY].to_numpy()),
+        ),
+        cells["count"].to_numpy(),
+    )
+    return tensor
+
+
+def weight_tensor(policies: Mapping[str, tuple[float, float, float, float]] = POLICY_WEIGHTS) -> np.ndarray:
+    """``W[policy, metric, quantity, score]``; quantity 0 = successes, 1 = total."""
+    weights = np.zeros((len(policies), 2, 2, len(SCORES)))
+    # Non-equivocal scores: a bacterial score agrees with the PPA, a viral one with the NPA
+    weights[:, 0, 0, :2] = (1, 0)
+    weights[:, 1, 0, :2] = (0, 1)
+    weights[:, :, 1, :2] = 1
+    # Equivocal scores: one row per policy
+    weights[:, :, :, 2] = np.asarray(list(policies.values()), dtype=np.float64).reshape(-1, 2, 2)
+    return weights
+
+
+def policy_metrics(
+    counts: pl.DataFrame,
+    policies: Mapping[str, tuple[float, float, float, float]] = POLICY_WEIGHTS,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    alpha: float = 0.05,
+) -> pl.DataFrame:
+    """PPA and NPA with Wilson CIs for every policy and cohort.
+
+    ``counts`` is a `contingency_tables` result. Returns one row per
+    (policy, cohort, metric) with ``successes`` and ``total`` (fractional
+    under the ``split`` policy), ``estimate``, ``ci_lower`` and
+    ``ci_upper``. The ``included`` and ``excluded`` rows equal those of
+    `agreement_metrics`.
+    """
+    # The PPA reads the positive group (axis 1 index 0), the NPA the negative one
+    totals = np.einsum("cms,pmqs->pcmq", count_tensor(counts, cohorts), weight_tensor(policies))
+    successes, total = totals[..., 0].ravel(), totals[..., 1].ravel()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        estimate = successes / total
+    ci_lower, ci_upper = wilson_interval(successes, total, alpha)
+
+    shape = totals.shape[:3]
+    index = np.indices(shape).reshape(3, -1)
+    return pl.DataFrame({
+        "policy": np.asarray(list(policies))[index[0]],
+        "cohort": np.asarray(list(cohorts))[index[1]],
+        "metric": np.asarray(METRICS)[index[2]],
+        "successes": successes,
+        "total": total,
+        "estimate": estimate,
+        "ci_lower": ci_lower,
+        "ci_upper": ci_upper,
+    })
@@ -0,0 +1,83 @@
+"""Text formatting of the numeric results, for display only.
+
+The computed tables keep plain numbers (estimates and CI bounds as
+fractions); they are what `christina_paper.export` writes out. Strings
+like ``"89.97% (95% CI: 86.37% - 92.71%)"`` are built here, only where a
+table is shown.
+"""
+
+from collections.abc import Mapping
+
+import polars as pl
+
+from christina_paper.agreement import EQUIVOCALS_INCLUDED
+
+COHORT_TITLES = {"clinical": "Clinical Management", "molecular": "Molecular Detection"}
+
+
+def _percent(column: str) -> pl.Expr:
+    # Same text as Python's f"{x:.2%}", which rounds the exact binary value of
+    # x * 100 half-to-even. Scaling that by 100 again rounds too, so the
+    # product's error is recovered exactly (Dekker's split) to settle ties.
+    percent = pl.col(column) * 100
+    scaled = percent * 100
+    split = percent * 134_217_729
+    high = split - (split - percent)
+    error = (high * 100 - scaled) + (percent - high) * 100
+    below = scaled.floor()
+    past_half = scaled - below - 0.5
+    round_up = (past_half > 0) | (
+        (past_half == 0) & ((error > 0) | ((error == 0) & (below % 2 == 1)))
+    )
+    # NaN (e.g. 0/0) and infinities are masked before the integer cast
+    finite = pl.col(column).is_finite()
+    hundredths = pl.when(finite).then(below + round_up.cast(pl.Float64)).cast(pl.Int64).abs()
+    number = pl.format(
+        "{}{}.{}%",
+        pl.when(pl.col(column) < 0).then(pl.lit("-")).otherwise(pl.lit("")),
+        hundredths // 100,
+        (hundredths % 100).cast(pl.String).str.zfill(2),
+    )
+    return (
+        pl.when(finite)
+        .then(number)
+        .when(pl.col(column).is_nan())
+        .then(pl.lit("nan%"))
+        .when(pl.col(column).is_not_null())
+        .then(pl.when(pl.col(column) > 0).then(pl.lit("inf%")).otherwise(pl.lit("-inf%")))
+        .otherwise(pl.lit("n/a"))
+    )
+
+
+def format_interval(
+    estimate: str = "estimate",
+    lower: str = "ci_lower",
+    upper: str = "ci_upper",
+) -> pl.Expr:
+    """``"<estimate>% (95% CI: <lower>% - <upper>%)"``, as a string expression."""
+    return pl.format(
+        "{} (95% CI: {} - {})", _percent(estimate), _percent(lower), _percent(upper)
+    )
+
+
+def agreement_summary(
+    agreement: pl.DataFrame,
+    titles: Mapping[str, str] = COHORT_TITLES,
+) -> pl.DataFrame:
+    """One row per cohort and metric, with the formatted results side by side.
+
+    ``agreement`` is an `agreement_metrics` result; its equivocal policies
+    become the "Including Equivocals" and "Excluding Equivocals" columns.
+    """
+    return (
+        agreement.select(
+            pl.col("cohort").replace(dict(titles)).alias("Cohort"),
+            pl.col("metric").alias("Metric"),
+            pl.when(pl.col("equivocals") == EQUIVOCALS_INCLUDED)
+            .then(pl.lit("Including Equivocals"))
+            .otherwise(pl.lit("Excluding Equivocals"))
+            .alias("policy"),
+            format_interval().alias("result"),
+        )
+        .pivot(on="policy", index=["Cohort", "Metric"], values="result")
+    )
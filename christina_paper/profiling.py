@@ -0,0 +1,180 @@
+"""Opt-in timing of the pipeline stages, and the query plans of the cohorts.
+
+Profiling is off unless `PROFILE_ENV_VAR` is set (``main.py run --profile``
+sets it). A `Profiler` records, for each stage (each executed notebook
+cell in a headless run):
+
+- the wall-clock and CPU time,
+- the growth of the process's peak resident memory (``ru_maxrss``), so a
+  stage that allocates nothing new past the previous peak reports 0,
+- the number of rows of the data frames the stage returns.
+
+`Profiler.timing_table` renders them as text, and `Profiler.write_trace`
+writes a Chrome trace (open it in ``chrome://tracing`` or Perfetto).
+`time_stages` times a set of calls in one go, for the notebook's own
+timing table.
+`query_plans` shows the optimized plan of each cohort query
+(`LazyFrame.explain`) next to the cost of collecting it. polars 2.0
+removed the per-node timings of ``LazyFrame.profile``, so each query is
+timed as a whole, as a `Stage`.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+from collections.abc import Callable, Iterator, Mapping
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import polars as pl
+
+from christina_paper.cohorts import COHORTS, Cohort, cohort, joint_counts, marginal_tables
+
+# Set to a non-empty value other than "0" to enable profiling
+PROFILE_ENV_VAR = "CHRISTINA_PAPER_PROFILE"
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get(PROFILE_ENV_VAR, "") not in ("", "0")
+
+
+def _peak_rss_bytes() -> int | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def output_rows(values: Mapping[str, Any]) -> int | None:
+    """Total rows of the data frames among ``values``, None if there are none."""
+    frames = [value for value in values.values() if isinstance(value, pl.DataFrame)]
+    return sum(frame.height for frame in frames) if frames else None
+
+
+class Stage(NamedTuple):
+    name: str
+    # Seconds since the profiler was created
+    start: float
+    wall: float
+    cpu: float
+    # Growth of the peak resident set size, in bytes
+    peak_rss_delta: int | None
+    rows: int | None
+
+
+class Profiler:
+    """Records the `Stage` timings of one run."""
+
+    def __init__(self) -> None:
+        self.stages: list[Stage] = []
+        self._origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[dict[str, Any]]:
+        """Time the body of the ``with`` block as stage ``name``.
+
+        Yields a dict; set its ``"rows"`` item to record the stage's output
+        row count.
+        """
+        record: dict[str, Any] = {"rows": None}
+        rss_before = _peak_rss_bytes()
+        cpu_before = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu_before
+            rss_after = _peak_rss_bytes()
+            self.stages.append(Stage(
+                name=name,
+                start=start - self._origin,
+                wall=wall,
+                cpu=cpu,
+                peak_rss_delta=None if rss_before is None else rss_after - rss_before,
+                rows=record["rows"],
+            ))
+
+    def timing_table(self) -> str:
+        """The stages as a text table, slowest first, with a total row."""
+        lines = [f"{'stage':<48} {'wall s':>9} {'cpu s':>9} {'peak RSS +MB':>13} {'rows':>10}"]
+        for stage in sorted(self.stages, key=lambda s: s.wall, reverse=True):
+            rss = "" if stage.peak_rss_delta is None else f"{stage.peak_rss_delta / 2**20:.1f}"
+            rows = "" if stage.rows is None else f"{stage.rows:,}"
+            lines.append(f"{stage.name[:48]:<48} {stage.wall:>9.4f} {stage.cpu:>9.4f} {rss:>13} {rows:>10}")
+        lines.append(
+            f"{'total':<48} {sum(s.wall for s in self.stages):>9.4f} "
+            f"{sum(s.cpu for s in self.stages):>9.4f}"
+        )
+        return "\n".join(lines)
+
+    def write_trace(self, path: str | Path) -> Path:
+        """Write the stages as complete events of the Chrome trace format."""
+        events = [
+            {
+                "name": stage.name,
+                "ph": "X",
+                "ts": stage.start * 1e6,
+                "dur": stage.wall * 1e6,
+                "pid": os.getpid(),
+                "tid": 0,
+                "args": {
+                    "cpu_s": stage.cpu,
+                    "peak_rss_delta_bytes": stage.peak_rss_delta,
+                    "rows": stage.rows,
+                },
+            }
+            for stage in self.stages
+        ]
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, indent=1))
+        return path
+
+
+def time_stages(stages: Mapping[str, Callable[[], Any]]) -> Profiler:
+    """Call each of ``stages`` in order, timing it as a stage of that name.
+
+    The rows recorded are those of the data frames each call returns,
+    alone or in a tuple.
+    """
+    profiler = Profiler()
+    for name, call in stages.items():
+        with profiler.stage(name) as record:
+            result = call()
+            returned = result if isinstance(result, tuple) else (result,)
+            record["rows"] = output_rows(dict(enumerate(returned)))
+    return profiler
+
+
+def query_plans(
+    frame: pl.DataFrame | pl.LazyFrame,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+) -> dict[str, str]:
+    """Optimized plan and collection cost of each cohort query.
+
+    One entry per cohort (the `cohort` filter) plus ``"contingency_tables"``
+    (the shared count of every cohort). Each entry holds the output of
+    `LazyFrame.explain` followed by the wall and CPU time of collecting
+    the query and the number of rows it returns.
+    """
+    queries = {name: cohort(frame, c.label) for name, c in cohorts.items()}
+    queries["contingency_tables"] = marginal_tables(joint_counts(frame, cohorts), cohorts)
+
+    profiler = Profiler()
+    plans = {}
+    for name, query in queries.items():
+        with profiler.stage(name) as record:
+            record["rows"] = query.collect().height
+        stage = profiler.stages[-1]
+        plans[name] = (
+            f"{query.explain()}\n\n"
+            f"Collected {stage.rows:,} rows in {stage.wall * 1e3:.2f}ms "
+            f"wall, {stage.cpu * 1e3:.2f}ms CPU"
+        )
+    return plans
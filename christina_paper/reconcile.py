@@ -0,0 +1,139 @@
+"""Search for the inclusion rules that reproduce a published table.
+
+Filtering the 'full dataset' does not reproduce every cohort the paper
+reports (the molecular cohort is 421 patients here, 370 in the paper).
+`reconcile` takes target counts and ``k`` candidate clauses (boolean
+expressions, e.g. "has a CAP diagnosis") and scores all ``2^k`` rules
+that AND some of them onto a cohort's definition, in one pass:
+
+1. each clause becomes a bit of a ``pattern`` integer per patient, and one
+   ``group_by`` counts the patients per (reference group, keys, pattern);
+2. a rule's count in a cell is the number of patients whose pattern has
+   all of the rule's bits set: a sum over supersets, computed for every
+   rule at once by a subset-sum transform over the ``2^k`` pattern counts
+   (``k`` vectorized passes);
+3. every rule's counts are compared with the targets, and the rules are
+   ranked by their total absolute difference, simplest rule first.
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+import polars as pl
+
+from christina_paper.cohorts import SCORE_CATEGORY
+
+# 2^20 rules x target cells of int64 counts is already ~50 MB per cell
+MAX_CLAUSES = 20
+
+# Extra 'full dataset' columns that candidate clauses read, with their types
+CANDIDATE_SCHEMA: dict[str, pl.DataType] = {
+    # 1 = community-acquired pneumonia or other respiratory tract infection
+    "CAP + RT infections": pl.UInt8,
+    # 1 = CAP by the CAPNOR a or b criteria
+    "CAPNORa or CAPNORb": pl.UInt8,
+    # SARS-CoV-2: 0 = not detected, 1-3 = detected
+    "SARSCOV_detection": pl.UInt8,
+    # Free text; "Ikke utført" = FilmArray not done
+    "Film array result": pl.String,
+    # "OK", "disconcordance", "Equivocal" or "NA"
+    "disconcordance Memed versus microbiol": pl.String,
+}
+
+# Candidate clauses for the molecular cohort of Table 5
+MOLECULAR_CLAUSES: dict[str, pl.Expr] = {
+    "respiratory infection": pl.col("CAP + RT infections") == 1,
+    "CAPNOR a or b": pl.col("CAPNORa or CAPNORb") == 1,
+    "no SARS-CoV-2": pl.col("SARSCOV_detection") == 0,
+    "FilmArray done": pl.col("Film array result") != "Ikke utført",
+    "microbiology assessed": pl.col("disconcordance Memed versus microbiol").is_in(
+        ["OK", "disconcordance", "Equivocal"]
+    ),
+    "infectious diagnosis": pl.col("UTDIAGN").is_in([1, 2, 3, 7, 9]),
+}
+
+# The paper's Table 5: molecular result x MeMed score category
+TABLE_5_TARGETS = pl.DataFrame(
+    {
+        "Molecular_Detection": ["Bacterial detections"] * 3 + ["Viral detections"] * 3,
+        SCORE_CATEGORY: [1, 2, 3, 1, 2, 3],
+        "count": [217, 18, 11, 40, 22, 11],
+    },
+    schema_overrides={SCORE_CATEGORY: pl.UInt8},
+)
+
+
+def _superset_sums(counts: np.ndarray, k: int) -> np.ndarray:
+    # After pass i, counts[..., s] sums the patterns that agree with s on
+    # the bits above i and contain s on bits 0..i
+    counts = counts.copy()
+    for i in range(k):
+        bit = 1 << i
+        view = counts.reshape(counts.shape[0], -1, 2, bit)
+        view[:, :, 0, :] += view[:, :, 1, :]
+    return counts
+
+
+def reconcile(
+    frame: pl.DataFrame | pl.LazyFrame,
+    label: pl.Expr,
+    clauses: Mapping[str, pl.Expr],
+    targets: pl.DataFrame,
+    top: int | None = 10,
+) -> pl.DataFrame:
+    """Rank the rules "``label`` is not null AND <subset of clauses>" by fit.
+
+    ``targets`` has a column named like ``label``, optionally further key
+    columns of ``frame`` (e.g. the score category), and ``count``. A null
+    clause counts as false.
+
+    Returns one row per rule, best first: ``clauses`` (the list ANDed
+    together, empty for the cohort as defined), ``n_clauses``,
+    ``abs_error`` (sum of absolute differences to the targets),
+    ``exact_cells`` (cells matched exactly) and one count column per
+    target cell, named after its keys. Only the ``top`` rules are kept.
+    """
+    names = list(clauses)
+    k = len(names)
+    if k > MAX_CLAUSES:
+        raise ValueError(f"{k} clauses give 2^{k} rules; at most {MAX_CLAUSES} are supported")
+    reference = label.meta.output_name()
+    keys = [reference, *(c for c in targets.columns if c not in (reference, "count"))]
+
+    pattern = pl.sum_horizontal(
+        pl.lit(0, dtype=pl.Int64),
+        *(clause.fill_null(False).cast(pl.Int64) * (1 << i) for i, clause in enumerate(clauses.values())),
+    )
+    patterns = (
+        frame.lazy()
+        .select(label, *keys[1:], pattern.alias("pattern"))
+        .drop_nulls(reference)
+        .group_by(*keys, "pattern")
+        .agg(pl.len().alias("n"))
+        .collect()
+    )
+
+    cells = targets.with_row_index("cell")
+    matched = cells.join(patterns, on=keys, how="inner")
+    counts = np.zeros((cells.height, 1 << k), dtype=np.int64)
+    np.add.at(counts, (matched["cell"].to_numpy(), matched["pattern"].to_numpy()), matched["n"].to_numpy())
+    counts = _superset_sums(counts, k)
+
+    target = cells["count"].to_numpy()[:, None]
+    rules = np.arange(1 << k)
+    n_clauses = np.bitwise_count(rules)
+    abs_error = np.abs(counts - target).sum(axis=0)
+    exact_cells = (counts == target).sum(axis=0)
+    order = np.lexsort((rules, n_clauses, abs_error))[:top]
+
+    cell_names = [
+        " / ".join(str(value) for value in row)
+        for row in cells.select(keys).iter_rows()
+    ]
+    return pl.DataFrame({
+        "clauses": [[names[i] for i in range(k) if rule >> i & 1] for rule in order],
+        "n_clauses": n_clauses[order].astype(np.int64),
+        "abs_error": abs_error[order],
+        "exact_cells": exact_cells[order],
+        **{name: counts[c, order] for c, name in enumerate(cell_names)},
+    })
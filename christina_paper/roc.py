@@ -0,0 +1,170 @@
+"""Threshold sweep, ROC curve and DeLong AUC of the continuous MeMed score.
+
+The score categories used elsewhere cut the 0-100 ``Score_Memed`` at
+fixed thresholds. `roc_curve` evaluates every possible cut-off at once:
+the scores are sorted a single time, and the confusion-matrix counts at
+each distinct score are cumulative sums over that order, so all
+thresholds cost O(n log n) instead of one filter per threshold. The
+PPA/NPA at each threshold get Wilson CIs from the vectorized
+`wilson_interval`. `curve_at` reads the curves at fixed cut-offs such as
+the paper's 35 and 66, which need not be scores any patient has.
+
+`delong_auc` computes the AUC and its DeLong variance from the placement
+values of the positive and negative scores, found with ``searchsorted``
+against the sorted scores of the other group rather than by comparing
+every pair.
+"""
+
+from collections.abc import Mapping
+from statistics import NormalDist
+from typing import NamedTuple
+
+import numpy as np
+import polars as pl
+
+from christina_paper.cohorts import COHORTS, Cohort
+from christina_paper.intervals import wilson_interval
+
+SCORE = "Score_Memed"
+
+
+class AucResult(NamedTuple):
+    auc: float
+    variance: float
+    ci_lower: float
+    ci_upper: float
+    n_positive: int
+    n_negative: int
+
+
+def cohort_scores(
+    frame: pl.DataFrame | pl.LazyFrame,
+    cohort: Cohort,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Scores of the cohort's positive and negative reference groups.
+
+    Returns ``(scores, positive)``, where ``positive`` flags the patients
+    in the bacterial reference group. Other groups of the cohort (e.g. no
+    detection) and patients without a score are left out.
+    """
+    labelled = (
+        frame.lazy()
+        .select(cohort.label.alias("group"), pl.col(SCORE).cast(pl.Float64))
+        .filter(pl.col("group").is_in([cohort.positive, cohort.negative]))
+        .drop_nulls(SCORE)
+        .collect()
+    )
+    return labelled[SCORE].to_numpy(), (labelled["group"] == cohort.positive).to_numpy()
+
+
+def roc_curve(
+    scores: np.ndarray,
+    positive: np.ndarray,
+    alpha: float = 0.05,
+) -> pl.DataFrame:
+    """Confusion counts and PPA/NPA at every threshold of ``scores``.
+
+    A patient is called bacterial when their score is at least
+    ``threshold``. One row per distinct score, from the highest down,
+    after a first row with an infinite threshold (nobody called
+    bacterial). ``ppa`` is the sensitivity and ``1 - npa`` the
+    false-positive rate of the ROC curve.
+    """
+    order = np.argsort(-scores, kind="stable")
+    sorted_scores = scores[order]
+    sorted_positive = positive[order]
+
+    # The last row of each run of equal scores holds the counts at that threshold
+    last_of_run = np.r_[sorted_scores[1:] != sorted_scores[:-1], True]
+    tp = np.r_[0, np.cumsum(sorted_positive)[last_of_run]]
+    fp = np.r_[0, np.cumsum(~sorted_positive)[last_of_run]]
+    n_positive = int(positive.sum())
+    n_negative = len(positive) - n_positive
+    fn = n_positive - tp
+    tn = n_negative - fp
+
+    ppa_lower, ppa_upper = wilson_interval(tp, n_positive, alpha)
+    npa_lower, npa_upper = wilson_interval(tn, n_negative, alpha)
+    return pl.DataFrame({
+        "threshold": np.r_[np.inf, sorted_scores[last_of_run]],
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "ppa": tp / n_positive, "ppa_lower": ppa_lower, "ppa_upper": ppa_upper,
+        "npa": tn / n_negative, "npa_lower": npa_lower, "npa_upper": npa_upper,
+    })
+
+
+def curve_at(curves: pl.DataFrame, thresholds: list[float]) -> pl.DataFrame:
+    """Rows of the stacked ``curves`` of `threshold_sweep` at given cut-offs.
+
+    A cut-off need not be a score anybody has: its counts are those of the
+    lowest curve threshold at or above it, i.e. of the same patients called
+    bacterial. One row per cohort and cut-off, labelled with the cut-off.
+    """
+    cutoffs = (
+        curves.select(pl.col("cohort").unique(maintain_order=True))
+        .with_row_index("order")
+        .join(pl.DataFrame({"cutoff": thresholds}, schema={"cutoff": pl.Float64}), how="cross")
+        .sort("cutoff")
+    )
+    # Both sides are sorted on the whole key column, so within each cohort too
+    return (
+        cutoffs.join_asof(
+            curves.sort("threshold"),
+            left_on="cutoff",
+            right_on="threshold",
+            by="cohort",
+            strategy="forward",
+            check_sortedness=False,
+        )
+        .sort("order", "cutoff")
+        .with_columns(pl.col("cutoff").alias("threshold"))
+        .drop("order", "cutoff")
+    )
+
+
+def delong_auc(
+    scores: np.ndarray,
+    positive: np.ndarray,
+    alpha: float = 0.05,
+) -> AucResult:
+    """AUC with its DeLong variance and a normal-approximation CI.
+
+    Ties between a positive and a negative score count one half.
+    """
+    pos = np.sort(scores[positive])
+    neg = np.sort(scores[~positive])
+    m, n = len(pos), len(neg)
+
+    # Placement values: the share of the other group each score beats
+    v10 = (np.searchsorted(neg, pos, side="left") + np.searchsorted(neg, pos, side="right")) / (2 * n)
+    v01 = 1 - (np.searchsorted(pos, neg, side="left") + np.searchsorted(pos, neg, side="right")) / (2 * m)
+
+    auc = float(v10.mean())
+    variance = float(v10.var(ddof=1) / m + v01.var(ddof=1) / n)
+    half_width = NormalDist().inv_cdf(1 - alpha / 2) * np.sqrt(variance)
+    return AucResult(
+        auc=auc,
+        variance=variance,
+        ci_lower=max(0.0, auc - half_width),
+        ci_upper=min(1.0, auc + half_width),
+        n_positive=m,
+        n_negative=n,
+    )
+
+
+def threshold_sweep(
+    frame: pl.DataFrame | pl.LazyFrame,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    alpha: float = 0.05,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """ROC curves and AUCs of every cohort's reference standard.
+
+    Returns ``(curves, aucs)``: the stacked `roc_curve` tables and one
+    `AucResult` row per cohort, both with a leading ``cohort`` column.
+    """
+    curves, aucs = [], []
+    for name, cohort in cohorts.items():
+        scores, positive = cohort_scores(frame, cohort)
+        curves.append(roc_curve(scores, positive, alpha).select(pl.lit(name).alias("cohort"), pl.all()))
+        aucs.append({"cohort": name, **delong_auc(scores, positive, alpha)._asdict()})
+    return pl.concat(curves), pl.DataFrame(aucs)
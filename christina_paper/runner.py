@@ -0,0 +1,349 @@
+"""Headless, incremental execution of the marimo notebook.
+
+The notebook's cells are parsed with `ast` rather than imported, so no
+marimo kernel is needed. Each cell's inputs are its function arguments and
+its outputs the names it returns, which gives the dependency graph marimo
+itself uses. Cells run in topological order, and each cell's outputs and
+printed text are pickled under a key that hashes:
+
+- the cell's code,
+- the keys of the cells it reads from,
+- for the cell that reads `DATA_ENV_VAR`, the workbook's cache key,
+- for cells that read `SUPPLEMENT_FILE`, the cache key of the supplementary
+  workbook next to the data (or that there is none),
+- for cells that call `profiling_enabled`, whether profiling is on, and
+- for cells that import `christina_paper`, the package's source.
+
+A cell is only executed when its key has no cache entry, so editing a
+Section 4 cell re-runs that cell alone and reads the cohort tables from the
+cache instead of re-parsing the workbook. Markdown cells, and cells only
+they read from (the ``import marimo`` cell), have no effect headlessly and
+are skipped, so a headless run never imports marimo.
+
+Passing a `Profiler` to `run_notebook` records each cell as a stage, with
+its wall and CPU time, peak memory growth and output rows. A profiled run
+reads nothing from the cache, so every cell is executed and timed (the
+fresh outputs are still written back).
+"""
+
+import ast
+import contextlib
+import hashlib
+import io
+import os
+import pickle
+from graphlib import TopologicalSorter
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from christina_paper.cache import _write_atomic, workbook_cache_key
+from christina_paper.profiling import Profiler, output_rows, profiling_enabled
+from christina_paper.verify import SUPPLEMENT_FILE
+
+# The notebook reads the workbook path from this variable when it is set
+DATA_ENV_VAR = "CHRISTINA_PAPER_DATA"
+
+DEFAULT_NOTEBOOK = Path(__file__).resolve().parent.parent / "data-analysis.py"
+DEFAULT_CACHE_DIR = Path(".cache") / "cells"
+
+PACKAGE_DIR = Path(__file__).resolve().parent
+
+
+# Outcome of a cell in a headless run
+EXECUTED = "executed"
+CACHED = "cached"
+SKIPPED = "skipped"
+
+
+class Cell(NamedTuple):
+    index: int
+    name: str
+    code: str
+    refs: tuple[str, ...]
+    defs: tuple[str, ...]
+    # Only renders markdown: a single `mo.md(...)` call and no outputs
+    markdown: bool
+
+
+class CellResult(NamedTuple):
+    cell: Cell
+    key: str
+    status: str
+    stdout: str
+
+
+# --- Parsing ---
+
+def _is_app_cell(decorator: ast.expr) -> bool:
+    # Matches both `@app.cell` and `@app.cell(hide_code=True)`
+    target = decorator.func if isinstance(decorator, ast.Call) else decorator
+    return (
+        isinstance(target, ast.Attribute)
+        and target.attr == "cell"
+        and isinstance(target.value, ast.Name)
+        and target.value.id == "app"
+    )
+
+
+def _returned_names(function: ast.FunctionDef) -> tuple[str, ...]:
+    last = function.body[-1]
+    if not isinstance(last, ast.Return) or last.value is None:
+        return ()
+    value = last.value
+    elements = value.elts if isinstance(value, ast.Tuple) else [value]
+    return tuple(element.id for element in elements if isinstance(element, ast.Name))
+
+
+def _is_markdown(function: ast.FunctionDef) -> bool:
+    body = [node for node in function.body if not isinstance(node, ast.Return)]
+    return (
+        len(body) == 1
+        and isinstance(body[0], ast.Expr)
+        and isinstance(body[0].value, ast.Call)
+        and ast.unparse(body[0].value.func) == "mo.md"
+        and not _returned_names(function)
+    )
+
+
+def parse_cells(notebook_path: str | Path) -> list[Cell]:
+    """The cells of a marimo notebook, in file order."""
+    source = Path(notebook_path).read_text(encoding="utf-8")
+    cells = []
+    for node in ast.parse(source).body:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        if not any(_is_app_cell(decorator) for decorator in node.decorator_list):
+            continue
+        # Decorators are left out so toggling `hide_code` does not invalidate the cell
+        node.decorator_list = []
+        cells.append(Cell(
+            index=len(cells),
+            name=node.name,
+            code=ast.unparse(node),
+            refs=tuple(arg.arg for arg in node.args.args),
+            defs=_returned_names(node),
+            markdown=_is_markdown(node),
+        ))
+    return cells
+
+
+def cell_graph(cells: list[Cell]) -> dict[int, set[int]]:
+    """Map each cell index to the indices of the cells it reads from."""
+    definer = {}
+    for cell in cells:
+        for name in cell.defs:
+            if name in definer:
+                raise ValueError(f"{name!r} is defined by more than one cell")
+            definer[name] = cell.index
+
+    graph = {}
+    for cell in cells:
+        missing = [name for name in cell.refs if name not in definer]
+        if missing:
+            raise ValueError(f"Cell {cell.index} reads undefined names: {missing}")
+        graph[cell.index] = {definer[name] for name in cell.refs}
+    return graph
+
+
+# --- Cache keys ---
+
+def package_fingerprint() -> str:
+    """Hash of the `christina_paper` sources, so library edits invalidate cells."""
+    digest = hashlib.sha256()
+    for path in sorted(PACKAGE_DIR.rglob("*.py")):
+        digest.update(path.relative_to(PACKAGE_DIR).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def supplement_cache_key(data_path: str | Path) -> str:
+    """Cache key of the `SUPPLEMENT_FILE` next to the data, "" when it is absent."""
+    supplement = Path(data_path).with_name(SUPPLEMENT_FILE)
+    return workbook_cache_key(supplement) if supplement.exists() else ""
+
+
+def cell_keys(
+    cells: list[Cell],
+    graph: dict[int, set[int]],
+    data_key: str,
+    supplement_key: str = "",
+) -> dict[int, str]:
+    package_key = package_fingerprint()
+    profile_key = str(profiling_enabled())
+    keys = {}
+    for index in TopologicalSorter(graph).static_order():
+        cell = cells[index]
+        digest = hashlib.sha256(cell.code.encode())
+        for upstream in sorted(graph[index]):
+            digest.update(keys[upstream].encode())
+        if DATA_ENV_VAR in cell.code:
+            digest.update(data_key.encode())
+        # Only its readers: the imports cell that defines the name is unaffected
+        if "SUPPLEMENT_FILE" in cell.refs:
+            digest.update(supplement_key.encode())
+        if "profiling_enabled()" in cell.code:
+            digest.update(profile_key.encode())
+        if "christina_paper" in cell.code:
+            digest.update(package_key.encode())
+        keys[index] = digest.hexdigest()[:32]
+    return keys
+
+
+# --- Execution ---
+
+def skipped_cells(cells: list[Cell], graph: dict[int, set[int]]) -> set[int]:
+    """Markdown cells, and cells that only markdown cells read from."""
+    skipped = {cell.index for cell in cells if cell.markdown}
+    readers: dict[int, set[int]] = {cell.index: set() for cell in cells}
+    for index, upstream in graph.items():
+        for u in upstream:
+            readers[u].add(index)
+    for cell in cells:
+        if readers[cell.index] and readers[cell.index] <= skipped:
+            skipped.add(cell.index)
+    return skipped
+
+
+def _execute(cell: Cell, inputs: dict[str, Any]) -> tuple[dict[str, Any], str]:
+    namespace = {}
+    exec(compile(cell.code, f"<cell {cell.index}>", "exec"), namespace)
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        returned = namespace[cell.name](**{name: inputs[name] for name in cell.refs})
+    if returned is None:
+        returned = ()
+    elif not isinstance(returned, tuple):
+        returned = (returned,)
+    return dict(zip(cell.defs, returned)), stdout.getvalue()
+
+
+def _stage_name(cell: Cell) -> str:
+    return f"cell {cell.index} ({', '.join(cell.defs)})" if cell.defs else f"cell {cell.index}"
+
+
+def run_notebook(
+    data_path: str | Path,
+    notebook_path: str | Path = DEFAULT_NOTEBOOK,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+    profiler: Profiler | None = None,
+) -> list[CellResult]:
+    """Execute the notebook headlessly, reusing cached cell outputs.
+
+    Returns one `CellResult` per cell, in file order. The outputs of cells
+    that cannot be pickled (e.g. imported modules) are not cached; those
+    cells are cheap and re-run only when a downstream cell has to execute.
+    With a ``profiler``, the cache is not read: every cell is executed and
+    recorded as a stage, so a warm run is timed in full.
+    """
+    cells = parse_cells(notebook_path)
+    graph = cell_graph(cells)
+    skipped = skipped_cells(cells, graph)
+    keys = cell_keys(cells, graph, workbook_cache_key(data_path), supplement_cache_key(data_path))
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    values: dict[int, dict[str, Any]] = {}
+    stdouts: dict[int, str] = {}
+    executed: set[int] = set()
+
+    def load(index: int) -> dict[str, Any]:
+        if index in values:
+            return values[index]
+        entry = cache_dir / f"{keys[index]}.pkl"
+        if profiler is None and entry.exists():
+            with entry.open("rb") as f:
+                cached_values, stdouts[index] = pickle.load(f)
+            # Entries of cells with unpicklable outputs only hold the printed text
+            if cached_values is not None:
+                values[index] = cached_values
+                return cached_values
+
+        inputs = {}
+        for upstream in graph[index]:
+            inputs.update(load(upstream))
+        if profiler is None:
+            values[index], stdouts[index] = _execute(cells[index], inputs)
+        else:
+            with profiler.stage(_stage_name(cells[index])) as record:
+                values[index], stdouts[index] = _execute(cells[index], inputs)
+                record["rows"] = output_rows(values[index])
+        executed.add(index)
+        try:
+            payload = pickle.dumps((values[index], stdouts[index]))
+        except (TypeError, pickle.PicklingError, AttributeError):
+            payload = pickle.dumps((None, stdouts[index]))
+        _write_atomic(entry, lambda tmp: tmp.write_bytes(payload))
+        return values[index]
+
+    previous = os.environ.get(DATA_ENV_VAR)
+    os.environ[DATA_ENV_VAR] = str(data_path)
+    try:
+        for index in TopologicalSorter(graph).static_order():
+            # Only cells that are missing from the cache, or whose outputs
+            # cannot be cached, need their upstream values in memory.
+            # Profiling executes every cell so each one is timed.
+            if index in skipped:
+                continue
+            if profiler is not None or not (cache_dir / f"{keys[index]}.pkl").exists():
+                load(index)
+        # The remaining cells are served from the cache for their printed output
+        for index in range(len(cells)):
+            if index not in stdouts and index not in skipped:
+                with (cache_dir / f"{keys[index]}.pkl").open("rb") as f:
+                    stdouts[index] = pickle.load(f)[1]
+    finally:
+        if previous is None:
+            del os.environ[DATA_ENV_VAR]
+        else:
+            os.environ[DATA_ENV_VAR] = previous
+
+    def status(index: int) -> str:
+        if index in skipped:
+            return SKIPPED
+        return EXECUTED if index in executed else CACHED
+
+    return [
+        CellResult(cell, keys[cell.index], status(cell.index), stdouts.get(cell.index, ""))
+        for cell in cells
+    ]
+
+
+def cached_outputs(
+    names: list[str] | tuple[str, ...],
+    data_path: str | Path,
+    notebook_path: str | Path = DEFAULT_NOTEBOOK,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+) -> dict[str, Any]:
+    """Values of the notebook outputs ``names``, read from the cell cache.
+
+    Meant to follow `run_notebook` with the same arguments, which leaves
+    every picklable output in the cache. Raises `KeyError` for a name that
+    no cell defines or whose value is not cached.
+    """
+    cells = parse_cells(notebook_path)
+    graph = cell_graph(cells)
+    keys = cell_keys(cells, graph, workbook_cache_key(data_path), supplement_cache_key(data_path))
+    definer = {name: cell.index for cell in cells for name in cell.defs}
+
+    outputs = {}
+    for name in names:
+        if name not in definer:
+            raise KeyError(f"No cell defines {name!r}")
+        entry = Path(cache_dir) / f"{keys[definer[name]]}.pkl"
+        cached_values = None
+        if entry.exists():
+            with entry.open("rb") as f:
+                cached_values = pickle.load(f)[0]
+        if cached_values is None:
+            raise KeyError(f"{name!r} is not in the cache; run the notebook first")
+        outputs[name] = cached_values[name]
+    return outputs
+
+
+def write_report(results: list[CellResult], out_dir: str | Path) -> Path:
+    """Write the printed output of every cell, in notebook order, to ``report.txt``."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    report = out_dir / "report.txt"
+    report.write_text("".join(result.stdout for result in results), encoding="utf-8")
+    return report
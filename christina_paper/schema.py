@@ -0,0 +1,46 @@
+"""Declared column types for the sheets of the MeMed workbook.
+
+Pinning the schema means polars does not have to scan every row to guess
+column types, only the columns the analysis uses are loaded, and a value
+that does not fit (for example a typo in a "JA"/"NEI" column) raises at
+load time instead of silently turning into a string column.
+"""
+
+import polars as pl
+
+FULL_DATASET_SHEET = "full dataset"
+
+# Yes/no answers are recorded in Norwegian
+JA_NEI = pl.Enum(["JA", "NEI"])
+
+FULL_DATASET_SCHEMA: dict[str, pl.DataType] = {
+    # 0 = not healthy control, 1 = healthy control
+    "healthy_control": pl.UInt8,
+    # Antibiotics for 72 hours or more
+    "AB 72t": JA_NEI,
+    # Antibiotics started within 48 hours: 0 = no, 1 = yes, 2 = healthy control
+    "Oppst AB 48t": pl.UInt8,
+    # 1 = bacterial, 2 = viral, 3 = equivocal
+    "MeMed score category": pl.UInt8,
+    # 1 = bacterial, 2 = viral, 3 = nothing detected, 4 = FAP not done
+    "RTi Category  FAP B or V (BV=B)": pl.UInt8,
+    # MeMed score bands: 1 = 0-10 (high likelihood viral), 2 = 10-35,
+    # 3 = 35-65 (equivocal), 4 = 65-90, 5 = 90-100 (high likelihood bacterial)
+    "Score_Memed_intervals": pl.UInt8,
+    # Continuous MeMed BV score, 0-100 (>= 66 bacterial, <= 34 viral)
+    "Score_Memed": pl.UInt8,
+    # Final diagnosis: 0 = healthy, 1-3, 7 and 9 = infections,
+    # 4 = pulmonary embolism, 5 = heart failure,
+    # 6 = non-infectious COPD/asthma exacerbation, 8 = other
+    "UTDIAGN": pl.UInt8,
+    # Stratification variables: age in years, 0 = female, 1 = male, and the
+    # admission time as "YYYY-MM-DD HH:MM" text ("0" for healthy controls)
+    "AGE": pl.UInt8,
+    "SEX": pl.UInt8,
+    "PITIDINNKOMST": pl.String,
+}
+
+# Sheets that are loaded with a pinned schema; all others are inferred
+WORKBOOK_SCHEMAS: dict[str, dict[str, pl.DataType]] = {
+    FULL_DATASET_SHEET: FULL_DATASET_SCHEMA,
+}
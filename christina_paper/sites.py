@@ -0,0 +1,106 @@
+"""PPA/NPA across several hospital sites, one workbook per site.
+
+Every site's export has the layout of the paper's workbook. Parsing XLSX
+is CPU-bound, so the workbooks are loaded in a process pool; each worker
+returns only its site's long contingency table (a few dozen rows), which
+is cheap to send back. The per-site tables are stacked, and the pooled
+table is their sum, so the pooled PPA/NPA never needs the patient rows of
+all sites in one process.
+"""
+
+import glob
+import multiprocessing
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import polars as pl
+
+from christina_paper.agreement import agreement_metrics
+from christina_paper.cache import DEFAULT_CACHE_DIR, load_workbook_cached
+from christina_paper.cohorts import COHORTS, SCORE_CATEGORY, Cohort, contingency_tables
+from christina_paper.schema import FULL_DATASET_SHEET, WORKBOOK_SCHEMAS
+
+# Site label of the rows that combine every site
+POOLED_SITE = "pooled"
+
+
+def site_paths(pattern: str) -> list[Path]:
+    """Workbooks matching the glob ``pattern``, sorted for a stable site order."""
+    paths = sorted(Path(p) for p in glob.glob(pattern, recursive=True))
+    if not paths:
+        raise FileNotFoundError(f"No workbooks match {pattern!r}")
+    return paths
+
+
+def site_counts(
+    excel_file_path: str | Path,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+) -> pl.DataFrame:
+    """`contingency_tables` of one site's 'full dataset' sheet."""
+    sheets = load_workbook_cached(
+        excel_file_path,
+        sheet_names=[FULL_DATASET_SHEET],
+        schemas=WORKBOOK_SCHEMAS,
+        cache_dir=cache_dir,
+    )
+    return contingency_tables(sheets[FULL_DATASET_SHEET], cohorts)
+
+
+def multi_site_counts(
+    paths: list[Path],
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    n_jobs: int = 1,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+) -> pl.DataFrame:
+    """Stacked contingency tables of every site, with a leading ``site`` column.
+
+    The site is the workbook's file name without its extension.
+    """
+    if n_jobs == 1:
+        tables = [site_counts(path, cohorts, cache_dir) for path in paths]
+    else:
+        # Spawned, not forked: a fork of a process whose polars thread pool
+        # is running can deadlock in the child
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=spawn) as pool:
+            tables = list(pool.map(
+                site_counts, paths, [cohorts] * len(paths), [cache_dir] * len(paths)
+            ))
+
+    sites = [path.stem for path in paths]
+    if len(set(sites)) != len(sites):
+        raise ValueError(f"Site names are not unique: {sites}")
+    return pl.concat(
+        [table.select(pl.lit(site).alias("site"), pl.all()) for site, table in zip(sites, tables)]
+    )
+
+
+def multi_site_agreement(
+    pattern: str,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    alpha: float = 0.05,
+    n_jobs: int = 1,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+) -> pl.DataFrame:
+    """Per-site and pooled PPA/NPA of every workbook matching ``pattern``.
+
+    Returns the `agreement_metrics` columns with a leading ``site`` column;
+    the pooled rows, labelled `POOLED_SITE`, come last.
+    """
+    paths = site_paths(pattern)
+    if POOLED_SITE in (path.stem for path in paths):
+        raise ValueError(f"A site may not be named {POOLED_SITE!r}")
+    counts = multi_site_counts(paths, cohorts, n_jobs, cache_dir)
+
+    pooled = counts.group_by("cohort", "reference_group", SCORE_CATEGORY).agg(pl.col("count").sum())
+    per_site = [
+        agreement_metrics(site_table.drop("site"), cohorts, alpha)
+        .select(pl.lit(site).alias("site"), pl.all())
+        for (site,), site_table in counts.group_by("site", maintain_order=True)
+    ]
+    pooled_metrics = agreement_metrics(pooled, cohorts, alpha).select(
+        pl.lit(POOLED_SITE).alias("site"), pl.all()
+    )
+    return pl.concat([*per_site, pooled_metrics])
@@ -0,0 +1,176 @@
+"""Persistent, incrementally updated contingency counts.
+
+Recomputing the contingency tables means re-reading every patient ever
+enrolled. `CountStore` keeps them in a small SQLite file instead:
+
+- ``patients`` records, per patient and cohort, the reference group and
+  MeMed score category the patient was counted under;
+- ``counts`` holds the running (cohort, reference group, score) totals.
+
+`CountStore.add` and `CountStore.retract` apply a batch of patients as a
+delta in one transaction, so a refresh costs time proportional to the new
+rows. Adding a patient that is already stored first retracts their old
+labels, which makes repeated or corrected deliveries idempotent.
+`CountStore.counts` returns the same long table as
+`christina_paper.cohorts.contingency_tables`, so PPA/NPA and their CIs
+are computed from it in O(strata) with `agreement_metrics`.
+"""
+
+import hashlib
+import sqlite3
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+
+import polars as pl
+
+from christina_paper.cohorts import COHORTS, SCORE_CATEGORY, Cohort
+
+DEFAULT_STORE_PATH = Path(".cache") / "counts.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT NOT NULL,
+    cohort TEXT NOT NULL,
+    reference_group TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (patient_id, cohort)
+);
+CREATE TABLE IF NOT EXISTS counts (
+    cohort TEXT NOT NULL,
+    reference_group TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (cohort, reference_group, score)
+);
+"""
+
+
+def row_ids(frame: pl.DataFrame, name: str = "patient_id") -> pl.Series:
+    """Stable identifier per row, from a SHA-1 of all of its values.
+
+    For exports without a patient identifier. Hash the full sheet rather
+    than the few schema columns, or different patients with the same
+    labels and score would share an identifier.
+    """
+    text = frame.select(
+        pl.concat_str(
+            [pl.col(column).cast(pl.String).fill_null("\x00") for column in frame.columns],
+            separator="\x1f",
+        )
+    ).to_series()
+    return pl.Series(name, [hashlib.sha1(row.encode()).hexdigest() for row in text])
+
+
+class CountStore:
+    """Contingency counts of every cohort in `COHORTS`, stored in SQLite."""
+
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_STORE_PATH,
+        cohorts: Mapping[str, Cohort] = COHORTS,
+    ):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.cohorts = cohorts
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "CountStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _labels(self, frame: pl.DataFrame, id_column: str) -> pl.DataFrame:
+        # One row per (patient, cohort the patient belongs to)
+        if frame[id_column].is_duplicated().any():
+            raise ValueError(f"Column {id_column!r} has duplicate patient identifiers")
+        labels = (
+            frame.lazy()
+            .select(
+                pl.col(id_column).cast(pl.String).alias("patient_id"),
+                *[c.label.alias(name) for name, c in self.cohorts.items()],
+                pl.col(SCORE_CATEGORY).alias("score"),
+            )
+            .unpivot(
+                index=["patient_id", "score"],
+                on=list(self.cohorts),
+                variable_name="cohort",
+                value_name="reference_group",
+            )
+            .drop_nulls("reference_group")
+            .select("patient_id", "cohort", "reference_group", "score")
+            .collect()
+        )
+        if labels["score"].null_count():
+            raise ValueError(f"Patients in a cohort have no {SCORE_CATEGORY!r}")
+        return labels
+
+    def _retract_ids(self, ids: Iterable[str]) -> None:
+        # Decrement the counts of the stored labels, then forget the patients
+        cursor = self.connection.cursor()
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS delta_ids (patient_id TEXT PRIMARY KEY)")
+        cursor.execute("DELETE FROM delta_ids")
+        cursor.executemany("INSERT OR IGNORE INTO delta_ids VALUES (?)", ((i,) for i in ids))
+        cursor.execute(
+            """
+            UPDATE counts SET count = count - removed.n
+            FROM (
+                SELECT cohort, reference_group, score, COUNT(*) AS n
+                FROM patients JOIN delta_ids USING (patient_id)
+                GROUP BY cohort, reference_group, score
+            ) AS removed
+            WHERE counts.cohort = removed.cohort
+              AND counts.reference_group = removed.reference_group
+              AND counts.score = removed.score
+            """
+        )
+        cursor.execute("DELETE FROM counts WHERE count = 0")
+        cursor.execute("DELETE FROM patients WHERE patient_id IN (SELECT patient_id FROM delta_ids)")
+
+    def add(self, frame: pl.DataFrame, id_column: str = "patient_id") -> None:
+        """Count the patients in ``frame``, replacing any earlier version of them.
+
+        ``frame`` holds the `FULL_DATASET_SCHEMA` columns and ``id_column``.
+        """
+        labels = self._labels(frame, id_column)
+        with self.connection:
+            self._retract_ids(frame[id_column].cast(pl.String))
+            self.connection.executemany(
+                "INSERT INTO patients VALUES (?, ?, ?, ?)", labels.iter_rows()
+            )
+            self.connection.executemany(
+                """
+                INSERT INTO counts VALUES (?, ?, ?, ?)
+                ON CONFLICT (cohort, reference_group, score)
+                DO UPDATE SET count = count + excluded.count
+                """,
+                labels.group_by("cohort", "reference_group", "score").len().iter_rows(),
+            )
+
+    def retract(self, ids: Iterable[str] | pl.Series) -> None:
+        """Remove patients from the counts; unknown identifiers are ignored."""
+        with self.connection:
+            self._retract_ids(str(i) for i in ids)
+
+    def n_patients(self) -> int:
+        return self.connection.execute("SELECT COUNT(DISTINCT patient_id) FROM patients").fetchone()[0]
+
+    def counts(self) -> pl.DataFrame:
+        """The stored counts, shaped like `contingency_tables`."""
+        rows = self.connection.execute(
+            "SELECT cohort, reference_group, score, count FROM counts"
+            " ORDER BY cohort, reference_group, score"
+        ).fetchall()
+        return pl.DataFrame(
+            rows,
+            schema={
+                "cohort": pl.String,
+                "reference_group": pl.String,
+                SCORE_CATEGORY: pl.UInt8,
+                "count": pl.UInt32,
+            },
+            orient="row",
+        )
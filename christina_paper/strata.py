@@ -0,0 +1,117 @@
+"""PPA/NPA by subgroup, for every stratification level in one pass.
+
+Like SQL ``GROUPING SETS``: the data is scanned once and counted at the
+finest grain (every stratum variable x every cohort label x score, via
+`joint_counts`). That table has at most a few hundred rows, so each
+requested grouping set is a cheap re-aggregation of it rather than
+another scan of the patients. All sets are stacked into one long table
+and `agreement_metrics` attaches the Wilson CIs in a single vectorized
+pass.
+
+Strata are named polars expressions (`STRATA`). Add e.g.
+``{"site": pl.col("site")}`` for data stacked from several sites.
+"""
+
+import itertools
+from collections.abc import Mapping, Sequence
+
+import polars as pl
+
+from christina_paper.agreement import agreement_metrics
+from christina_paper.cohorts import COHORTS, Cohort, joint_counts, marginal_tables
+
+# Value of the ``grouping`` column for the unstratified rows
+OVERALL = "overall"
+
+_admission = (
+    pl.col("PITIDINNKOMST")
+    .str.slice(0, 16)
+    .str.to_datetime("%Y-%m-%d %H:%M", strict=False)
+)
+
+STRATA: dict[str, pl.Expr] = {
+    "age_band": pl.col("AGE").cut([64, 79], labels=["<65", "65-79", "80+"]).cast(pl.String),
+    "sex": pl.col("SEX").replace_strict({0: "female", 1: "male"}, default=None, return_dtype=pl.String),
+    # Meteorological seasons of the admission date
+    "season": _admission.dt.month().replace_strict(
+        {12: "winter", 1: "winter", 2: "winter",
+         3: "spring", 4: "spring", 5: "spring",
+         6: "summer", 7: "summer", 8: "summer",
+         9: "autumn", 10: "autumn", 11: "autumn"},
+        default=None,
+        return_dtype=pl.String,
+    ),
+}
+
+DEFAULT_GROUPING_SETS: list[tuple[str, ...]] = [(), ("age_band",), ("sex",), ("season",)]
+
+
+def rollup(*names: str) -> list[tuple[str, ...]]:
+    """Grouping sets of SQL ``ROLLUP``: (a, b, c), (a, b), (a) and ()."""
+    return [names[:i] for i in range(len(names), -1, -1)]
+
+
+def cube(*names: str) -> list[tuple[str, ...]]:
+    """Grouping sets of SQL ``CUBE``: every subset of ``names``."""
+    return [
+        subset
+        for size in range(len(names), -1, -1)
+        for subset in itertools.combinations(names, size)
+    ]
+
+
+def _grouping_label(grouping_set: tuple[str, ...]) -> str:
+    return ",".join(grouping_set) or OVERALL
+
+
+def stratified_counts(
+    frame: pl.DataFrame | pl.LazyFrame,
+    grouping_sets: Sequence[tuple[str, ...]] = DEFAULT_GROUPING_SETS,
+    strata: Mapping[str, pl.Expr] = STRATA,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+) -> pl.DataFrame:
+    """Contingency tables of every cohort for each grouping set, from one scan.
+
+    Columns: ``grouping`` (the set's strata joined by commas, or
+    `OVERALL`), one column per stratum used by any set (null where the set
+    does not group by it), then the `contingency_tables` columns.
+    """
+    used = [name for name in strata if any(name in s for s in grouping_sets)]
+    unknown = {name for s in grouping_sets for name in s} - set(strata)
+    if unknown:
+        raise ValueError(f"Unknown strata {sorted(unknown)}; expected some of {list(strata)}")
+
+    joint = joint_counts(frame, cohorts, by=[strata[name].alias(name) for name in used]).collect()
+
+    tables = []
+    for grouping_set in grouping_sets:
+        table = marginal_tables(joint, cohorts, by=list(grouping_set)).collect()
+        tables.append(
+            table.select(
+                pl.lit(_grouping_label(grouping_set)).alias("grouping"),
+                *[
+                    pl.col(name) if name in grouping_set else pl.lit(None, dtype=joint.schema[name]).alias(name)
+                    for name in used
+                ],
+                pl.exclude(used),
+            )
+        )
+    return pl.concat(tables)
+
+
+def stratified_agreement(
+    frame: pl.DataFrame | pl.LazyFrame,
+    grouping_sets: Sequence[tuple[str, ...]] = DEFAULT_GROUPING_SETS,
+    strata: Mapping[str, pl.Expr] = STRATA,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    alpha: float = 0.05,
+) -> pl.DataFrame:
+    """PPA/NPA with Wilson CIs for every stratum of every grouping set.
+
+    Long format: the `stratified_counts` key columns followed by the
+    `agreement_metrics` columns, one row per stratum, cohort, metric and
+    equivocal policy. Filter on ``grouping`` to pick a breakdown.
+    """
+    counts = stratified_counts(frame, grouping_sets, strata, cohorts)
+    by = counts.columns[: counts.columns.index("cohort")]
+    return agreement_metrics(counts, cohorts, alpha, by=by)
@@ -0,0 +1,130 @@
+"""Contingency counts from data that is too large to load in one piece.
+
+`pl.read_excel` builds the whole sheet in memory before any filtering.
+`iter_sheet_batches` instead walks the sheet row by row with openpyxl's
+read-only (SAX-style) reader and yields small typed DataFrames holding
+only the schema's columns. `streaming_contingency_tables` drops healthy
+controls from each batch, counts it with `joint_counts` and folds the
+result into a running joint table that never has more rows than there
+are label/score combinations. Peak memory is therefore bounded by the
+batch size, not by the sheet.
+
+Data that is already exported to CSV or Parquet takes the lazy path
+instead: the same query runs on polars' streaming engine over a scan of
+the file.
+"""
+
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+
+import polars as pl
+
+from christina_paper.cohorts import COHORTS, Cohort, joint_counts, marginal_tables
+from christina_paper.schema import FULL_DATASET_SCHEMA, FULL_DATASET_SHEET
+
+DEFAULT_BATCH_SIZE = 50_000
+
+_not_control = pl.col("healthy_control") == 0
+
+
+def iter_sheet_batches(
+    excel_file_path: str | Path,
+    sheet_name: str = FULL_DATASET_SHEET,
+    schema: Mapping[str, pl.DataType] = FULL_DATASET_SCHEMA,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[pl.DataFrame]:
+    """Yield the sheet as DataFrames of at most ``batch_size`` rows.
+
+    The first row is the header. Only the columns in ``schema`` are kept,
+    cast strictly to their declared types; fully empty rows are skipped.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(excel_file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header = next(rows, ())
+        positions = {}
+        for i, name in enumerate(header):
+            # Like pl.read_excel, a repeated header name refers to its first column
+            if name in schema and name not in positions:
+                positions[name] = i
+        missing = [name for name in schema if name not in positions]
+        if missing:
+            raise ValueError(f"Sheet {sheet_name!r} has no columns {missing}")
+
+        def to_frame(batch):
+            columns = {name: [row[positions[name]] for row in batch] for name in schema}
+            # Cells of one column may mix numbers and text; the cast below is strict
+            return pl.DataFrame(columns, strict=False).cast(dict(schema))
+
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) == batch_size:
+                yield to_frame(batch)
+                batch = []
+        if batch:
+            yield to_frame(batch)
+    finally:
+        workbook.close()
+
+
+def _fold(running: pl.DataFrame | None, batch: pl.DataFrame) -> pl.DataFrame:
+    # Merge one batch's joint counts into the running joint table
+    if running is None:
+        return batch
+    keys = [name for name in batch.columns if name != "count"]
+    return (
+        pl.concat([running, batch])
+        .group_by(keys, maintain_order=True)
+        .agg(pl.col("count").sum())
+    )
+
+
+def streaming_joint_counts(
+    batches: Iterator[pl.DataFrame],
+    cohorts: Mapping[str, Cohort] = COHORTS,
+) -> pl.DataFrame:
+    """`joint_counts` of the non-control patients, accumulated batch by batch."""
+    running = None
+    for batch in batches:
+        running = _fold(running, joint_counts(batch.filter(_not_control), cohorts).collect())
+    if running is None:
+        # No rows at all: an empty joint table with the right columns
+        empty = pl.DataFrame(schema=dict(FULL_DATASET_SCHEMA))
+        running = joint_counts(empty, cohorts).collect()
+    return running
+
+
+def scan_data(path: str | Path, schema: Mapping[str, pl.DataType] = FULL_DATASET_SCHEMA) -> pl.LazyFrame:
+    """Lazy scan of a CSV or Parquet export, restricted to the schema's columns."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        frame = pl.scan_csv(path, schema_overrides=dict(schema))
+    elif path.suffix.lower() == ".parquet":
+        frame = pl.scan_parquet(path)
+    else:
+        raise ValueError(f"Expected a .csv or .parquet file, got {path.name!r}")
+    return frame.select(list(schema)).cast(dict(schema))
+
+
+def streaming_contingency_tables(
+    path: str | Path,
+    cohorts: Mapping[str, Cohort] = COHORTS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> pl.DataFrame:
+    """`contingency_tables` of a workbook, CSV or Parquet file, in bounded memory.
+
+    Workbooks are read ``batch_size`` rows at a time from the
+    'full dataset' sheet; CSV and Parquet files are scanned lazily and
+    counted on polars' streaming engine.
+    """
+    if Path(path).suffix.lower() in (".xlsx", ".xlsm"):
+        joint = streaming_joint_counts(iter_sheet_batches(path, batch_size=batch_size), cohorts)
+        return marginal_tables(joint, cohorts).collect()
+
+    joint = joint_counts(scan_data(path).filter(_not_control), cohorts)
+    return marginal_tables(joint, cohorts).collect(engine="streaming")
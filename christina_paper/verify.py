@@ -0,0 +1,334 @@
+"""Check the published supplementary tables against the raw 'full dataset'.
+
+`read_supplement` reads 'Supplementary Table 1 and 2.xlsx' in one
+openpyxl pass into long cells, ``(table, row, group, published,
+tolerance)``. `supplement_cells` computes the same cells from 'full
+dataset':
+
+- Supplementary Table 1 (healthy controls vs. suspected CAP patients) is
+  published as aggregates, and is recomputed with one ``group_by``.
+- Supplementary Table 2 lists the patients without molecular detections.
+  The published list and the dataset's patients are aggregated the same
+  way (`_table_2_cells`: counts per diagnosis and score band, and the
+  median score, per management group), so the two sides compare like with
+  like.
+
+`verify_supplement` joins both on (table, row, group) in a single join and
+returns every cell that differs by more than the published rounding: half
+a unit of the published value's last decimal, so 42.3 (%) allows 42.25 to
+42.35 and a count must match exactly. Differences already traced to the
+published table are listed in `PUBLISHED_ERRATA` and carry a ``note``.
+"""
+
+import re
+from collections.abc import Mapping
+from pathlib import Path
+
+import polars as pl
+
+from christina_paper.cohorts import (
+    BACTERIAL_MANAGEMENT,
+    NO_DETECTION,
+    VIRAL_MANAGEMENT,
+    clinical_management,
+    molecular_detection,
+)
+
+SUPPLEMENT_FILE = "Supplementary Table 1 and 2.xlsx"
+TABLE_1 = "Supplementary Table 1"
+TABLE_2 = "Supplementary Table 2"
+
+# --- Supplementary Table 1: MeMed BV score of the healthy controls ---
+# Groups by 'healthy_control'; the names match the published headers
+CONTROL_GROUPS = {1: "Healthy controls", 0: "Suspected CAP patients"}
+
+# MeMed score bands by 'Score_Memed_intervals' code
+SCORE_BANDS = {1: "0-10", 2: "10-35", 3: "35-65", 4: "65-90", 5: "90-100"}
+
+# Published row label -> (cells of its value column, cell of its "n" column).
+# A value column can hold several numbers, e.g. "42.6 (16 - 87, 17.6 )"
+TABLE_1_ROWS: dict[str, tuple[tuple[str, ...], str]] = {
+    "Age in years, mean (range, SD)": (("age mean", "age min", "age max", "age SD"), "age n"),
+    "Sex, Female, n (%)": (("female %",), "female n"),
+    "MeMed score (median, IQR)": (("score median", "score Q1", "score Q3"), "score n"),
+    **{f"{band} (%)": ((f"score {band} %",), f"score {band} n") for band in SCORE_BANDS.values()},
+}
+
+# --- Supplementary Table 2: patients with no molecular detections ---
+ALL_PATIENTS = "All"
+NOT_MANAGED = "Not in a management group"
+
+# Published "Clinically mananged" -> management group of `clinical_management`
+TABLE_2_MANAGEMENT = {
+    "Bacterial infection": BACTERIAL_MANAGEMENT,
+    "Non-bacterial/viral infection": VIRAL_MANAGEMENT,
+    "Not included***": NOT_MANAGED,
+}
+
+# Published "MeMed BV result" -> score band
+TABLE_2_RESULTS = {
+    "High likelihood of viral infection (or other non-bacterial etiology)": "0-10",
+    "Moderate likelihood of viral infection (or other non-bacterial etiology)": "10-35",
+    "Equivocal": "35-65",
+    "Moderate likelihood of bacterial infection (or co-infection)": "65-90",
+    "High likelihood of bacterial infection (or co-infection)": "90-100",
+}
+
+# Published "Diagnosis" -> 'UTDIAGN' codes
+TABLE_2_DIAGNOSES = {
+    "Pneumonia, radiologically confirmed": (1,),
+    "Pneumonia, not radiologically confirmed": (2,),
+    "URTI**, bronchitis, or influenza without pneumonia": (3,),
+    "Other*": (4, 5, 6, 8),
+}
+# Diagnoses the published list has no label for (infections 7 and 9)
+UNLISTED_DIAGNOSIS = "Unlisted"
+
+# (table, row, group) -> (value the dataset gives, to 2 decimals, and why
+# the published cell differs). A cell that moves off that value is reported
+# as unexpected again.
+PUBLISHED_ERRATA: dict[tuple[str, str, str], tuple[float, str]] = {
+    (TABLE_1, "female %", "Suspected CAP patients"): (
+        42.38,
+        "192/453 females is 42.38%, truncated rather than rounded to 42.3%",
+    ),
+    (TABLE_1, "female n", "Suspected CAP patients"): (
+        192,
+        "192 of the patients are female and 261 male; 262 matches neither",
+    ),
+    (TABLE_1, "score 90-100 n", "Suspected CAP patients"): (
+        297,
+        "The published 65.6% is 297/453; 298 would be 65.8%",
+    ),
+    (TABLE_1, "score n", "Suspected CAP patients"): (
+        453,
+        "The group has 453 patients, as its column header says",
+    ),
+}
+
+_NUMBER = re.compile(r"\d+(?:\.(\d+))?")
+_GROUP_SIZE = re.compile(r"(.*?)\s*\(n=(\d+)\)")
+
+
+def _numbers(value: object) -> list[tuple[float, float]]:
+    # (number, tolerance) of every number in a cell, e.g. " 20 (9.5-24.75)"
+    return [
+        (float(match.group()), 0.5 * 10.0 ** -len(match.group(1) or ""))
+        for match in _NUMBER.finditer(str(value))
+    ]
+
+
+def _read_table_1(rows: list[tuple]) -> list[tuple]:
+    header = next(row for row in rows if row[0] == "Characteristics")
+    groups = []
+    cells = []
+    for column in (1, 3):
+        group, size = _GROUP_SIZE.fullmatch(header[column].strip()).groups()
+        groups.append((column, group))
+        cells.append((TABLE_1, "patients", group, float(size), 0.5))
+
+    for row in rows:
+        label = " ".join(str(row[0]).replace(", (%)", " (%)").split())
+        if label not in TABLE_1_ROWS:
+            continue
+        names, n_name = TABLE_1_ROWS[label]
+        for column, group in groups:
+            numbers = _numbers(row[column])
+            if len(numbers) != len(names):
+                raise ValueError(
+                    f"{TABLE_1} {label!r}: expected {len(names)} numbers, got {row[column]!r}"
+                )
+            cells += [(TABLE_1, name, group, *number) for name, number in zip(names, numbers)]
+            if row[column + 1] is not None:
+                cells.append((TABLE_1, n_name, group, *_numbers(row[column + 1])[0]))
+    return cells
+
+
+def _read_table_2(rows: list[tuple]) -> pl.DataFrame:
+    # One row per patient between the column headers and the footnotes
+    header = rows[1]
+    schema = {
+        "Diagnosis": pl.String,
+        "Memed BV Score": pl.Float64,
+        "MeMed BV result": pl.String,
+        "Clinically mananged": pl.String,
+    }
+    columns = [header.index(name) for name in schema]
+    patients = [row for row in rows[2:] if row[columns[1]] is not None]
+    published = pl.DataFrame([[row[i] for i in columns] for row in patients], schema=schema, orient="row")
+    # replace_strict raises on a label the mappings do not know
+    return published.select(
+        pl.col("Diagnosis").str.strip_chars().replace_strict(
+            {label: label for label in TABLE_2_DIAGNOSES}
+        ).alias("diagnosis"),
+        pl.col("MeMed BV result").str.strip_chars().replace_strict(TABLE_2_RESULTS).alias("score band"),
+        pl.col("Memed BV Score").alias("score"),
+        pl.col("Clinically mananged")
+        .str.strip_chars()
+        .replace_strict(TABLE_2_MANAGEMENT)
+        .alias("management"),
+    )
+
+
+def read_supplement(path: str | Path) -> pl.DataFrame:
+    """The published cells of both supplementary tables, in long format.
+
+    One row per number: ``table``, ``row``, ``group``, ``published`` and
+    ``tolerance`` (half a unit of its last published decimal). Table 2's
+    patient list is aggregated by `_table_2_cells`.
+    """
+    # openpyxl takes noticeable time to import and is only needed here
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        table_1 = list(workbook[TABLE_1].iter_rows(values_only=True))
+        table_2 = list(workbook[TABLE_2].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+    schema = {
+        "table": pl.String,
+        "row": pl.String,
+        "group": pl.String,
+        "published": pl.Float64,
+        "tolerance": pl.Float64,
+    }
+    return pl.concat([
+        pl.DataFrame(_read_table_1(table_1), schema=schema, orient="row"),
+        # Aggregates of the published values are compared exactly
+        _table_2_cells(_read_table_2(table_2).lazy())
+        .rename({"value": "published"})
+        .with_columns(tolerance=pl.lit(0.0))
+        .select(list(schema))
+        .collect(),
+    ])
+
+
+def _table_2_cells(patients: pl.LazyFrame) -> pl.LazyFrame:
+    # Long cells of a Table 2 patient list (diagnosis, score band, score,
+    # management), per management group and for all patients together
+    everyone = pl.concat([patients, patients.with_columns(management=pl.lit(ALL_PATIENTS))])
+    wide = everyone.group_by("management").agg(
+        pl.len().cast(pl.Float64).alias("patients"),
+        *(
+            (pl.col("diagnosis") == label).sum().cast(pl.Float64).alias(f"diagnosis {label}")
+            for label in (*TABLE_2_DIAGNOSES, UNLISTED_DIAGNOSIS)
+        ),
+        *(
+            (pl.col("score band") == band).sum().cast(pl.Float64).alias(f"score {band} n")
+            for band in SCORE_BANDS.values()
+        ),
+        pl.col("score").median().alias("score median"),
+    )
+    return wide.unpivot(index="management", variable_name="row", value_name="value").select(
+        pl.lit(TABLE_2).alias("table"),
+        "row",
+        pl.col("management").alias("group"),
+        "value",
+    )
+
+
+def _weibull_quantile(column: str, quantile: float) -> pl.Expr:
+    # The (n + 1)p quantile of SPSS and Excel's QUARTILE.EXC, which the
+    # published IQRs use; polars' methods give 10.5-24.25 for 9.5-24.75
+    values = pl.col(column).drop_nulls().sort().cast(pl.Float64)
+    n = values.len()
+    position = ((n + 1) * quantile).clip(1, n)
+    below = position.floor().cast(pl.Int64)
+    above = (below + 1).clip(upper_bound=n)
+    lower, upper = values.gather(below - 1), values.gather(above - 1)
+    return lower + (position - below) * (upper - lower)
+
+
+def supplement_cells(frame: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+    """The cells of `read_supplement`, computed from 'full dataset'.
+
+    Returns ``table``, ``row``, ``group`` and ``computed``.
+    """
+    frame = frame.lazy()
+    n = pl.len()
+    female = (pl.col("SEX") == 0).sum()
+    band_counts = {
+        band: (pl.col("Score_Memed_intervals") == code).sum() for code, band in SCORE_BANDS.items()
+    }
+    table_1 = (
+        frame.filter(pl.col("healthy_control").is_in(list(CONTROL_GROUPS)))
+        .group_by(pl.col("healthy_control").replace_strict(CONTROL_GROUPS).alias("group"))
+        .agg(
+            n.alias("patients"),
+            pl.col("AGE").mean().alias("age mean"),
+            pl.col("AGE").min().alias("age min"),
+            pl.col("AGE").max().alias("age max"),
+            pl.col("AGE").std().alias("age SD"),
+            pl.col("AGE").count().alias("age n"),
+            female.alias("female n"),
+            (100 * female / n).alias("female %"),
+            pl.col("Score_Memed").median().alias("score median"),
+            _weibull_quantile("Score_Memed", 0.25).first().alias("score Q1"),
+            _weibull_quantile("Score_Memed", 0.75).first().alias("score Q3"),
+            pl.col("Score_Memed").count().alias("score n"),
+            *(count.alias(f"score {band} n") for band, count in band_counts.items()),
+            *((100 * count / n).alias(f"score {band} %") for band, count in band_counts.items()),
+        )
+        .with_columns(pl.exclude("group").cast(pl.Float64))
+        .unpivot(index="group", variable_name="row", value_name="value")
+        .select(pl.lit(TABLE_1).alias("table"), "row", "group", "value")
+    )
+
+    diagnosis = pl.lit(UNLISTED_DIAGNOSIS)
+    for label, codes in TABLE_2_DIAGNOSES.items():
+        diagnosis = pl.when(pl.col("UTDIAGN").is_in(codes)).then(pl.lit(label)).otherwise(diagnosis)
+    no_detection = frame.filter(molecular_detection() == NO_DETECTION).select(
+        diagnosis.alias("diagnosis"),
+        pl.col("Score_Memed_intervals").replace_strict(SCORE_BANDS, default=None).alias("score band"),
+        pl.col("Score_Memed").cast(pl.Float64).alias("score"),
+        clinical_management().fill_null(NOT_MANAGED).alias("management"),
+    )
+
+    cells = pl.concat([table_1, _table_2_cells(no_detection)])
+    return cells.rename({"value": "computed"}).collect()
+
+
+def verify_supplement(
+    frame: pl.DataFrame | pl.LazyFrame,
+    supplement: str | Path | pl.DataFrame,
+    tolerance: float = 0.0,
+    errata: Mapping[tuple[str, str, str], tuple[float, str]] = PUBLISHED_ERRATA,
+) -> pl.DataFrame:
+    """Every published cell that the dataset does not reproduce.
+
+    ``supplement`` is the workbook's path or a `read_supplement` result.
+    A cell disagrees when it differs by more than its published rounding
+    plus ``tolerance``, or when the dataset has no such cell. Returns
+    ``table``, ``row``, ``group``, ``published``, ``computed``,
+    ``difference`` and ``note``: the `PUBLISHED_ERRATA` explanation if the
+    dataset still gives the erratum's value, else null (unexpected).
+    """
+    published = supplement if isinstance(supplement, pl.DataFrame) else read_supplement(supplement)
+    notes = pl.DataFrame(
+        [(*key, *erratum) for key, erratum in errata.items()],
+        schema={
+            "table": pl.String,
+            "row": pl.String,
+            "group": pl.String,
+            "expected": pl.Float64,
+            "note": pl.String,
+        },
+        orient="row",
+    )
+    keys = ["table", "row", "group"]
+    difference = pl.col("computed") - pl.col("published")
+    return (
+        published.join(supplement_cells(frame), on=keys, how="left")
+        .join(notes, on=keys, how="left")
+        .filter(~(difference.abs() <= pl.col("tolerance") + tolerance + 1e-9).fill_null(False))
+        .select(
+            *keys,
+            "published",
+            "computed",
+            difference.alias("difference"),
+            pl.when((pl.col("computed") - pl.col("expected")).abs() <= 0.005).then("note").alias("note"),
+        )
+        .sort(keys)
+    )
@@ -0,0 +1,155 @@
+"""Loading the MeMed Excel workbook."""
+
+import re
+from collections.abc import Mapping
+from datetime import time
+from pathlib import Path
+from typing import NamedTuple
+
+import polars as pl
+
+
+class SheetInfo(NamedTuple):
+    """Name and declared size (rows x columns) of one worksheet.
+
+    The size is 0 x 0 when the sheet has no ``<dimension>`` tag (openpyxl's
+    write-only mode, for one, does not write it), i.e. when it is unknown.
+    """
+
+    name: str
+    n_rows: int
+    n_cols: int
+
+
+def list_sheets(excel_file_path: str | Path) -> list[SheetInfo]:
+    """List the worksheets of the workbook without loading any cells.
+
+    In read-only mode openpyxl only reads the workbook manifest and the
+    ``<dimension>`` tag at the top of each sheet, so this costs
+    milliseconds instead of building every cell object in memory.
+    """
+    # openpyxl takes noticeable time to import and is only needed here
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(excel_file_path, read_only=True)
+    try:
+        return [
+            SheetInfo(
+                name=sheet.title,
+                n_rows=(sheet.max_row or 0) - (sheet.min_row or 1) + 1,
+                n_cols=(sheet.max_column or 0) - (sheet.min_column or 1) + 1,
+            )
+            for sheet in workbook.worksheets
+        ]
+    finally:
+        workbook.close()
+
+
+def is_table_sheet(sheet: SheetInfo) -> bool:
+    """True if the sheet is big enough to hold a header plus data columns.
+
+    Metadata sheets such as the 'flytskjema' flowchart only hold a couple
+    of loose cells and are not worth parsing as a table. A sheet of unknown
+    size (0 x 0) may hold anything, so it is parsed.
+    """
+    if sheet.n_rows == 0 or sheet.n_cols == 0:
+        return True
+    return sheet.n_rows >= 2 and sheet.n_cols >= 2
+
+
+# fastexcel dtype that a pinned polars dtype is parsed as
+_PARSER_DTYPES: dict[type[pl.DataType], str] = {
+    pl.Int8: "int", pl.Int16: "int", pl.Int32: "int", pl.Int64: "int",
+    pl.UInt8: "int", pl.UInt16: "int", pl.UInt32: "int", pl.UInt64: "int",
+    pl.Float32: "float", pl.Float64: "float",
+    pl.String: "string", pl.Enum: "string", pl.Categorical: "string",
+    pl.Boolean: "boolean", pl.Date: "date", pl.Datetime: "datetime",
+}
+
+_UNNAMED = re.compile(r"__UNNAMED__\d+")
+
+
+def _tidy(frame: pl.DataFrame) -> pl.DataFrame:
+    # The clean-up pl.read_excel applies to an inferred sheet: drop empty
+    # unnamed columns and empty rows, then read integral floats back as
+    # Int64 and midnight-only datetimes as Date
+    empty = [
+        name
+        for name, column in frame.to_dict().items()
+        if (name == "" or _UNNAMED.fullmatch(name))
+        and (
+            column.null_count() == frame.height
+            or (column.dtype.is_numeric() and column.replace(0, None).null_count() == frame.height)
+        )
+    ]
+    frame = frame.drop(empty).filter(~pl.all_horizontal(pl.all().is_null()))
+
+    checks = {}
+    for name, dtype in frame.schema.items():
+        if dtype.is_float():
+            checks[name] = (
+                (pl.col(name).floor().eq_missing(pl.col(name)) & pl.col(name).is_not_nan()),
+                pl.col(name).cast(pl.Int64),
+            )
+        elif dtype == pl.Datetime:
+            checks[name] = (pl.col(name).dt.time() == time(0), pl.col(name).cast(pl.Date))
+    if not checks:
+        return frame
+    fits = frame.select(
+        check.all(ignore_nulls=True).alias(name) for name, (check, _) in checks.items()
+    ).row(0)
+    return frame.with_columns(cast for fit, (_, cast) in zip(fits, checks.values()) if fit)
+
+
+def load_workbook(
+    excel_file_path: str | Path,
+    sheet_names: list[str] | None = None,
+    schemas: Mapping[str, Mapping[str, pl.DataType]] | None = None,
+    optional_schemas: Mapping[str, Mapping[str, pl.DataType]] | None = None,
+) -> dict[str, pl.DataFrame]:
+    """Parse the sheets of the workbook in a single pass.
+
+    One fastexcel reader (the parser behind `pl.read_excel`) opens the file
+    and parses each sheet exactly once, so the cost scales with the size of
+    the workbook rather than with sheets x workbook size. The result maps
+    sheet name -> DataFrame, in workbook order. Pass ``sheet_names`` to
+    parse only a subset.
+
+    Sheets listed in ``schemas`` are parsed with only the declared columns
+    and dtypes (see `christina_paper.schema`), which skips type inference;
+    the final cast is strict, so a value that does not fit fails loudly.
+    ``optional_schemas`` adds columns to a pinned sheet that are loaded
+    the same way when the sheet has them, and left out when it does not.
+    All other sheets have their types inferred from every row, and are
+    tidied the way `pl.read_excel` does it.
+    """
+    # fastexcel is only needed here; polars imports it lazily too
+    import fastexcel
+
+    schemas = schemas or {}
+    optional_schemas = optional_schemas or {}
+    reader = fastexcel.read_excel(str(excel_file_path))
+    if sheet_names is None:
+        sheet_names = reader.sheet_names
+
+    sheets = {}
+    for name in sheet_names:
+        if name in schemas:
+            required = dict(schemas[name])
+            schema = {**optional_schemas.get(name, {}), **required}
+            sheet = reader.load_sheet(
+                name,
+                use_columns=lambda column, schema=schema: column.name in schema,
+                dtypes={column: _PARSER_DTYPES[dtype.base_type()] for column, dtype in schema.items()},
+            )
+            frame = sheet.to_polars()
+            if missing := [column for column in required if column not in frame.columns]:
+                raise pl.exceptions.ColumnNotFoundError(f"sheet {name!r} has no columns {missing}")
+            # Declared order: required columns first, then the optional ones present
+            schema = {**required, **{c: t for c, t in schema.items() if c in frame.columns}}
+            sheets[name] = frame.select(list(schema)).filter(
+                ~pl.all_horizontal(pl.all().is_null())
+            ).cast(schema)
+        else:
+            sheets[name] = _tidy(reader.load_sheet(name, schema_sample_rows=None).to_polars())
+    return sheets
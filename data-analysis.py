@@ -12,10 +12,75 @@ def _(mo):
 
 @app.cell
 def _():
+    import os
+
     import polars as pl
-    from statsmodels.stats.proportion import proportion_confint
-    import openpyxl
-    return openpyxl, pl, proportion_confint
+
+    from christina_paper.agreement import agreement_metrics, descriptive_proportions
+    from christina_paper.bitmap import BitmapIndex
+    from christina_paper.bootstrap import bootstrap_agreement
+    from christina_paper.cache import list_sheets_cached, load_workbook_cached
+    from christina_paper.cohorts import (
+        COHORTS,
+        cohort_contingency,
+        cohort_size,
+        contingency_tables,
+        joint_counts,
+    )
+    from christina_paper.intervals import proportion_interval, wilson_interval
+    from christina_paper.plots import forest_plot, forest_points
+    from christina_paper.policies import policy_metrics
+    from christina_paper.presentation import agreement_summary, format_interval
+    from christina_paper.profiling import profiling_enabled, query_plans, time_stages
+    from christina_paper.reconcile import (
+        CANDIDATE_SCHEMA,
+        MOLECULAR_CLAUSES,
+        TABLE_5_TARGETS,
+        reconcile,
+    )
+    from christina_paper.roc import curve_at, threshold_sweep
+    from christina_paper.schema import FULL_DATASET_SHEET, WORKBOOK_SCHEMAS
+    from christina_paper.strata import cube, stratified_agreement
+    from christina_paper.verify import SUPPLEMENT_FILE, verify_supplement
+    from christina_paper.workbook import is_table_sheet
+    return (
+        BitmapIndex,
+        CANDIDATE_SCHEMA,
+        COHORTS,
+        FULL_DATASET_SHEET,
+        MOLECULAR_CLAUSES,
+        SUPPLEMENT_FILE,
+        TABLE_5_TARGETS,
+        WORKBOOK_SCHEMAS,
+        agreement_metrics,
+        agreement_summary,
+        bootstrap_agreement,
+        cohort_contingency,
+        cohort_size,
+        contingency_tables,
+        cube,
+        curve_at,
+        descriptive_proportions,
+        forest_plot,
+        forest_points,
+        format_interval,
+        is_table_sheet,
+        joint_counts,
+        list_sheets_cached,
+        load_workbook_cached,
+        os,
+        pl,
+        policy_metrics,
+        profiling_enabled,
+        proportion_interval,
+        query_plans,
+        reconcile,
+        stratified_agreement,
+        threshold_sweep,
+        time_stages,
+        verify_supplement,
+        wilson_interval,
+    )
 
 
 @app.cell(hide_code=True)
@@ -24,40 +89,78 @@ def _(mo):
         r"""
     ### Explanation
 
-    **What this cell does:** This cell imports the three external Python libraries required for the analysis.
+    **What this cell does:** This cell imports `polars`, the one external library the analysis needs up front, plus our own helpers from the `christina_paper` package. Heavier libraries (`openpyxl`, `scipy`) are only imported inside the helpers that use them, when they are first called.
 
+    *   `os` is used to read the workbook path from the `CHRISTINA_PAPER_DATA` environment variable, when it is set.
+    
     *   `polars` is imported with the conventional alias `pl`.
     
-    *   `proportion_confint` is a specific function imported from the `statsmodels` library.
+    *   `wilson_interval` computes the Wilson score confidence interval of a proportion (the same result as `proportion_confint(..., method="wilson")` from `statsmodels`, without importing `statsmodels`).
+    
+    *   `list_sheets_cached` and `is_table_sheet` enumerate the worksheets of the Excel file (using `openpyxl` under the hood).
+    
+    *   `load_workbook_cached` is our helper that parses every sheet of the workbook in one pass and caches the result on disk.
+    
+    *   `WORKBOOK_SCHEMAS` declares the columns and data types we load from the `'full dataset'` sheet.
+    
+    *   `contingency_tables`, `cohort_contingency` and `cohort_size` count the patients of every cohort (clinical management and molecular detection) and extract each cohort's contingency table.
     
-    *   `openpyxl` is imported to handle Excel files.
+    *   `agreement_metrics` and `descriptive_proportions` compute the PPA/NPA and descriptive proportions, with their confidence intervals, directly from the data.
+    
+    *   `joint_counts` and `bootstrap_agreement` provide bootstrap confidence intervals as an alternative to the Wilson method.
+    
+    *   `stratified_agreement` and `cube` compute the PPA/NPA of every subgroup (age band, sex, season) in one pass.
+    
+    *   `threshold_sweep` evaluates every cut-off of the continuous MeMed score (ROC curve and AUC).
+    
+    *   `proportion_interval` computes exact (Clopper-Pearson) and mid-p confidence intervals for the small groups of the descriptive tables.
     
 
     **Why we do it:**
 
     *   **`polars`**: This is our primary data manipulation library. All data from the Excel files is read into `polars` DataFrames, which we then use for filtering, grouping, and cleaning.
     
-    *   **`proportion_confint`**: This function is central to the analysis. It performs the statistical calculation for the 95% confidence intervals for the PPA and NPA metrics, directly addressing the reviewer's main statistical request.
+    *   **`wilson_interval`**: This function is central to the analysis. It performs the statistical calculation for the 95% confidence intervals for the PPA and NPA metrics, directly addressing the reviewer's main statistical request.
+    
+    *   **`list_sheets_cached`**: This helper uses `openpyxl` in read-only mode to programmatically list all the sheet names in the workbook, together with their size, which was a crucial step in understanding the file's structure.
+    
+    *   **`load_workbook_cached`**: Parsing an `.xlsx` file is slow, so we read the whole workbook once and share the parsed sheets between the preview cell and the `df` cell. The parsed sheets are also saved as Arrow IPC files under `.cache/workbooks/`, keyed by the file's content hash and modification time, so later runs memory-map them instead of parsing the workbook again. Any change to the Excel file automatically invalidates the cache.
     
-    *   **`openpyxl`**: This library is a necessary dependency for `polars` to read and parse `.xlsx` files. We also use it directly to programmatically list all the sheet names in the workbook, which was a crucial step in understanding the file's structure.
+    *   **`WORKBOOK_SCHEMAS`**: Instead of letting `polars` guess column types by scanning every row, we declare the type of each column we use (defined in `christina_paper/schema.py`). Only those columns are loaded, using compact types, and unexpected values raise an error when the data is loaded rather than later when filtering.
+    
+    *   **`contingency_tables` and friends**: The cohort rules are written once, in the `COHORTS` registry in `christina_paper/cohorts.py`, as one `polars` expression per cohort. This lets `polars` count every cohort in one pass over the data.
     """
     )
     return
 
 
 @app.cell(hide_code=True)
-def _(openpyxl):
-    excel_file_path = 'data/Datasett_MeMed_AUG_2025 – Kopi.xlsx'
+def _(FULL_DATASET_SHEET, is_table_sheet, list_sheets_cached, os):
+    # The headless runner (`python main.py run --data ...`) points this at another workbook
+    excel_file_path = os.environ.get('CHRISTINA_PAPER_DATA', 'data/Datasett_MeMed_AUG_2025 – Kopi.xlsx')
 
-    # Load the workbook to inspect it
-    workbook = openpyxl.load_workbook(excel_file_path)
+    # Read only the workbook manifest: sheet names and their dimensions
+    sheet_infos = list_sheets_cached(excel_file_path)
 
     # Get the list of all sheet names
-    all_sheet_names = workbook.sheetnames
+    all_sheet_names = [info.name for info in sheet_infos]
+
+    # Sheets that hold an actual table (skips loose-cell metadata sheets);
+    # 'full dataset' is always loaded, whatever its declared size
+    table_sheet_names = [
+        info.name
+        for info in sheet_infos
+        if is_table_sheet(info) or info.name == FULL_DATASET_SHEET
+    ]
 
     print("Found the following sheets in the Excel file:")
     print(all_sheet_names)
-    return all_sheet_names, excel_file_path
+    for info in sheet_infos:
+        if info.n_rows and info.n_cols:
+            print(f"  {info.name}: {info.n_rows} rows x {info.n_cols} columns")
+        else:
+            print(f"  {info.name}: size not declared")
+    return all_sheet_names, excel_file_path, table_sheet_names
 
 
 @app.cell(hide_code=True)
@@ -66,29 +169,46 @@ def _(mo):
         r"""
     ### Explanation
 
-    **What this cell does:** This cell uses the `openpyxl` library to open the Excel workbook from the specified file path. It then extracts a list of all the worksheet names contained within that file and stores them in the `all_sheet_names` variable. Finally, it prints this list to the console.
+    **What this cell does:** This cell uses `list_sheets_cached` to read the manifest of the Excel workbook from the specified file path (or from the path in the `CHRISTINA_PAPER_DATA` environment variable, which the headless runner sets). It extracts a list of all the worksheet names contained within that file and stores them in the `all_sheet_names` variable, together with the declared size (rows x columns) of each sheet. Sheets that are too small to hold a table (such as the `'flytskjema'` flowchart) are left out of `table_sheet_names`; a sheet whose size is not declared in the file is kept, and `'full dataset'` is always kept. Finally, it prints this information to the console.
 
-    **Why we do it:** We do this to understand the structure of the multi-sheet Excel file without manual inspection. It allowed us to identify our target raw data sheet (`'full dataset'`). We also realized that the file also contained many pre-filtered and metadata sheets.
+    **Why we do it:** We do this to understand the structure of the multi-sheet Excel file without manual inspection. It allowed us to identify our target raw data sheet (`'full dataset'`). We also realized that the file also contained many pre-filtered and metadata sheets. Opening the workbook in `openpyxl`'s read-only mode only reads the sheet list and dimensions, instead of building every cell of every sheet in memory, which takes seconds on larger exports.
     """
     )
     return
 
 
 @app.cell(hide_code=True)
-def _(all_sheet_names, excel_file_path, pl):
-    # The list 'all_sheet_names' from the previous cell is used here
-    for sheet in all_sheet_names:
+def _(
+    CANDIDATE_SCHEMA,
+    FULL_DATASET_SHEET,
+    WORKBOOK_SCHEMAS,
+    excel_file_path,
+    load_workbook_cached,
+    table_sheet_names,
+):
+    # Parse every table sheet of the workbook once (or memory-map the cached
+    # copy when the file is unchanged); later cells share this dict.
+    # 'full dataset' is loaded with its declared schema, plus the columns the
+    # Table 5 reconciliation reads when the workbook has them.
+    sheets = load_workbook_cached(
+        excel_file_path,
+        sheet_names=table_sheet_names,
+        schemas=WORKBOOK_SCHEMAS,
+        optional_schemas={FULL_DATASET_SHEET: CANDIDATE_SCHEMA},
+    )
+    return (sheets,)
+
+
+@app.cell(hide_code=True)
+def _(sheets, table_sheet_names):
+    # The list 'table_sheet_names' from the previous cells is used here
+    for sheet in table_sheet_names:
         print("="*50)
         print(f"Previewing sheet: '{sheet}'")
         print("="*50)
 
-        # Load the current sheet
-        # Note: This might raise an error on metadata sheets if they aren't table-like.
-        temp_df = pl.read_excel(
-            source=excel_file_path,
-            sheet_name=sheet,
-            infer_schema_length=None
-        )
+        # The sheet was already parsed by load_workbook
+        temp_df = sheets[sheet]
     
         # Print the first 10 rows
         print(temp_df.head(10))
@@ -102,23 +222,19 @@ def _(mo):
         r"""
     ### Explanation
 
-    **What this cell does:** This cell iterates through the `all_sheet_names` list. For each sheet name in the list, it loads the corresponding worksheet into a temporary `polars` DataFrame and prints the name of the sheet followed by its first 10 rows. The `infer_schema_length=None` argument is used to help `polars` correctly guess the data type of each column by scanning the entire sheet, which reduces data type warnings.
+    **What this cell does:** The first cell calls `load_workbook_cached`, which opens the Excel file once and parses all of its table worksheets into a dictionary of `polars` DataFrames called `sheets` (or reads them back from the on-disk cache if the file has not changed since the last run). The second cell iterates through the `table_sheet_names` list and, for each sheet, prints its name followed by the first 10 rows of the already-parsed DataFrame. For the exploratory sheets the loader uses `infer_schema_length=None` to help `polars` correctly guess the data type of each column by scanning the entire sheet, which reduces data type warnings. The `'full dataset'` sheet is instead loaded with the declared schema from `WORKBOOK_SCHEMAS`, so its preview only shows the columns used in the analysis.
 
-    **Why we do it:** We do this to efficiently survey the contents of all 23 sheets in the Excel file. This automated preview is faster than manual inspection and provides a complete overview of the workbook's structure. The output helps distinguish between raw data sheets, metadata, and pre-calculated summary tables.
+    **Why we do it:** We do this to efficiently survey the contents of the sheets in the Excel file. This automated preview is faster than manual inspection and provides a complete overview of the workbook's structure. The output helps distinguish between raw data sheets, metadata, and pre-calculated summary tables. Previously each sheet was read with its own `pl.read_excel` call, which unzipped and parsed the whole workbook 23 times (plus once more for `df`); parsing it once keeps notebook start-up proportional to the workbook size.
     """
     )
     return
 
 
 @app.cell(hide_code=True)
-def _(pl):
+def _(sheets):
     sheet_name_to_load = 'full dataset'
 
-    df = pl.read_excel(
-        source='data/Datasett_MeMed_AUG_2025 – Kopi.xlsx',
-        sheet_name=sheet_name_to_load,
-        infer_schema_length=None
-    )
+    df = sheets[sheet_name_to_load]
 
     df
     return (df,)
@@ -130,9 +246,9 @@ def _(mo):
         r"""
     ### Explanation
 
-    **What this cell does:** This cell loads a single worksheet, named `'full dataset'`, from the Excel workbook into a `polars` DataFrame called `df`, and previews it.
+    **What this cell does:** This cell takes a single worksheet, named `'full dataset'`, from the already-parsed `sheets` dictionary into a `polars` DataFrame called `df`, and previews it. No second read of the Excel file is needed. Only the columns declared in `christina_paper/schema.py` are loaded (plus, when present, the few columns of `CANDIDATE_SCHEMA` that the Table 5 reconciliation in Section 2 reads), with compact types: small integer codes are stored as `UInt8` and the `"JA"`/`"NEI"` answers in `AB 72t` as an `Enum`.
 
-    **Why we do it:** We do this to load the primary data source for the analysis into memory. The previous exploration identified the `'full dataset'` sheet as the one containing the complete raw data. This step prepares the main `df` variable that is used in all subsequent filtering and calculation steps.
+    **Why we do it:** We do this to load the primary data source for the analysis into memory. The previous exploration identified the `'full dataset'` sheet as the one containing the complete raw data. This step prepares the main `df` variable that is used in all subsequent filtering and calculation steps. Declaring the types up front avoids scanning every row twice to infer them, and makes sure mixed columns such as `AB 72t` (text) and `Oppst AB 48t` (numbers) always load the same way.
     """
     )
     return
@@ -173,44 +289,43 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(df, pl):
-    # --- Define the clinical management cohort based on the paper's rules ---
+def _(contingency_tables, df):
+    # --- Count every cohort in the COHORTS registry in one pass over df ---
+    # One row per (cohort, reference group, MeMed score category)
+    cohort_counts = contingency_tables(df)
+
+    cohort_counts
+    return (cohort_counts,)
 
-    # 1. Patients managed as "viral/non-bacterial"
-    viral_management_group = df.filter(
-        (pl.col("healthy_control") == 0) &
-        (pl.col("AB 72t") == "NEI")
-    )
 
-    # 2. Patients managed as "bacterial"
-    bacterial_management_group = df.filter(
-        (pl.col("healthy_control") == 0) &
-        (pl.col("AB 72t") == "JA") &
-        (pl.col("Oppst AB 48t") == 1) # Must have started AB within 48h
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ### Explanation
+
+    **What this cell does:** This cell counts the patients of every cohort defined in the `COHORTS` registry (in `christina_paper/cohorts.py`) and stores the result in a long table called `cohort_counts`, with one row per cohort, reference group and `MeMed score category`. The registry currently holds the clinical management cohort and the molecular detection cohort; each one is a single rule that labels every patient with their reference group (or leaves them out).
+
+    **Why we do it:** We do this so that all cohorts are computed together in a single `group_by` over one pass of `df`, instead of each cohort cell filtering the data separately. The next cells simply pick their cohort out of this table. Adding another reference standard only requires a new entry in the registry.
+    """
     )
+    return
 
-    # 3. Combine them to get the final cohort of 442 patients
-    clinical_df = pl.concat([
-        viral_management_group,
-        bacterial_management_group
-    ])
 
-    # --- Create the contingency table ---
-    clinical_contingency = clinical_df.group_by("AB 72t", "MeMed score category").agg(
-        pl.len().alias("count")
-    ).sort("AB 72t", descending=True)
+@app.cell(hide_code=True)
+def _(cohort_contingency, cohort_counts, cohort_size):
+    # --- Define the clinical management cohort based on the paper's rules ---
+    # The "clinical" cohort labels each patient "Bacterial management" or
+    # "Viral/non-bacterial management" (patients outside the cohort are left out):
+    #   - Bacterial: healthy_control == 0, AB 72t == "JA" and Oppst AB 48t == 1
+    #   - Viral/non-bacterial: healthy_control == 0 and AB 72t == "NEI"
 
-    # For clarity, rename the values to match our previous analysis
-    clinical_contingency = clinical_contingency.with_columns(
-        pl.when(pl.col("AB 72t") == "JA")
-          .then(pl.lit("Bacterial management"))
-          .otherwise(pl.lit("Viral/non-bacterial management"))
-          .alias("Clinical_management")
-    ).drop("AB 72t")
+    # --- Take the 442-patient cohort's contingency table from the shared counts ---
+    clinical_contingency = cohort_contingency(cohort_counts, "clinical")
 
 
     print("--- Clinical Management Cohort ---")
-    print(f"Filtered down to {clinical_df.height} patients.")
+    print(f"Filtered down to {cohort_size(cohort_counts, 'clinical')} patients.")
     print("Contingency Table:")
     print(clinical_contingency)
     return (clinical_contingency,)
@@ -222,19 +337,19 @@ def _(mo):
         r"""
     ### Explanation
 
-    **What this cell does:** This cell constructs the 442-patient clinical management cohort and the final contingency table in several steps:
+    **What this cell does:** This cell extracts the 442-patient clinical management cohort's contingency table from `cohort_counts`. The rules live in `clinical_management()` (in `christina_paper/cohorts.py`), which labels every patient in a single expression:
 
-    *   **1\. Filters for the "Viral/Non-bacterial" Group (n=93):**
+    *   **1\. The "Viral/Non-bacterial" Group (n=93):**
     
-        *   It selects rows from the main `df` where:
+        *   Rows from the main `df` where:
         
             *   The `healthy_control` column is `0` (to exclude the control group).
             
             *   The `AB 72t` column is `"NEI"` (indicating antibiotic treatment was less than 72 hours).
             
-    *   **2\. Filters for the "Bacterial" Group (n=349):**
+    *   **2\. The "Bacterial" Group (n=349):**
     
-        *   It selects rows from the main `df` where:
+        *   Rows from the main `df` where:
         
             *   The `healthy_control` column is `0`.
             
@@ -242,13 +357,13 @@ def _(mo):
             
             *   The `Oppst AB 48t` column is `1` (ensuring antibiotics were also started within the first 48 hours).
             
-    *   **3\. Creates the Final Cohort and Contingency Table:**
+    *   **3\. Creates the Contingency Table:**
     
-        *   It combines these two separate groups into the final `clinical_df` DataFrame.
+        *   The 442 labelled patients form the cohort; their label is shown in a descriptive `Clinical_management` column.
         
-        *   It then groups this 442-patient cohort by the `AB 72t` and `MeMed score category` columns, counting the number of patients in each subgroup to create the `clinical_contingency` table.
+        *   `cohort_contingency` takes this cohort's rows of `cohort_counts`, i.e. the number of patients in each `Clinical_management` and `MeMed score category` subgroup, as the `clinical_contingency` table.
         
-        *   Finally, it adds a more descriptive `Clinical_management` column to the table for clarity.
+        *   The counts come from the shared one-pass computation in the previous cell, so no extra scan of `df` is needed.
         
 
     **Why we do it:** We do this to precisely replicate the clinical management cohort from the paper. The multi-step filtering is necessary to apply the study's specific inclusion/exclusion criteria. This logic correctly defines the "bacterial" group as not just receiving long-term antibiotics, but also starting them promptly. This process ensures the resulting contingency table is the correct basis for calculating the PPA and NPA.
@@ -258,7 +373,7 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(clinical_contingency, pl, proportion_confint):
+def _(clinical_contingency, pl, wilson_interval):
     # --- PPA Calculation (Bacterial Management) ---
     # Get the total number of patients in the 'Bacterial management' group
     ppa_total = clinical_contingency.filter(
@@ -272,7 +387,7 @@ def _(clinical_contingency, pl, proportion_confint):
     )["count"][0]
 
     # Calculate the confidence interval
-    ppa_ci = proportion_confint(count=ppa_success, nobs=ppa_total, alpha=0.05, method='wilson')
+    ppa_ci = wilson_interval(count=ppa_success, nobs=ppa_total, alpha=0.05)
 
     print(f"PPA (Bacterial Management): {ppa_success / ppa_total:.2%} (95% CI: {ppa_ci[0]:.2%} - {ppa_ci[1]:.2%})")
 
@@ -290,7 +405,7 @@ def _(clinical_contingency, pl, proportion_confint):
     )["count"][0]
 
     # Calculate the confidence interval
-    npa_ci = proportion_confint(count=npa_success, nobs=npa_total, alpha=0.05, method='wilson')
+    npa_ci = wilson_interval(count=npa_success, nobs=npa_total, alpha=0.05)
 
     print(f"NPA (Viral/Non-bacterial Management): {npa_success / npa_total:.2%} (95% CI: {npa_ci[0]:.2%} - {npa_ci[1]:.2%})")
     return
@@ -310,7 +425,7 @@ def _(mo):
         
         *   It finds the number of those patients who also had a 'Bacterial' MeMed score (`MeMed score category` is `1`), which represents the successful agreements (n=314).
         
-        *   It uses `proportion_confint` to calculate the 95% confidence interval for this proportion.
+        *   It uses `wilson_interval` to calculate the 95% confidence interval for this proportion.
         
     *   **For the NPA (Viral/Non-bacterial Management):**
     
@@ -318,7 +433,7 @@ def _(mo):
         
         *   It finds the number of those patients who also had a 'Viral' MeMed score (`MeMed score category` is `2`), representing the successful agreements (n=41).
         
-        *   It uses `proportion_confint` to calculate the 95% confidence interval for this proportion.
+        *   It uses `wilson_interval` to calculate the 95% confidence interval for this proportion.
         
 
     **Why we do it:** This cell performs the core statistical analysis for the clinical cohort to meet the reviewer's requirements. The PPA measures the test's agreement with clinical decisions for bacterial cases, while the NPA measures its agreement for non-bacterial cases. The primary goal is to compute the confidence intervals, which quantify the statistical uncertainty of these performance metrics.
@@ -328,31 +443,16 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(df, pl):
-    # Filter for the 370 patients in the molecular analysis cohort
+def _(cohort_contingency, cohort_counts, cohort_size):
+    # The "molecular" cohort is the 370 patients in the molecular analysis cohort
     # The RTi Category column codes are: 1=Bacterial, 2=Viral, 3=No Detection
-    molecular_df = df.filter(
-        (pl.col("healthy_control") == 0) &
-        (pl.col("RTi Category  FAP B or V (BV=B)").is_in([1, 2, 3]))
-    )
-
-    # Create the contingency table for the PPA/NPA analysis (groups 1 and 2)
-    molecular_contingency = molecular_df.filter(
-        pl.col("RTi Category  FAP B or V (BV=B)").is_in([1, 2])
-    ).group_by("RTi Category  FAP B or V (BV=B)", "MeMed score category").agg(
-        pl.len().alias("count")
-    ).sort("RTi Category  FAP B or V (BV=B)")
-
-    # Map the numeric codes to text for clarity
-    molecular_contingency = molecular_contingency.with_columns(
-        pl.when(pl.col("RTi Category  FAP B or V (BV=B)") == 1)
-          .then(pl.lit("Bacterial detections"))
-          .otherwise(pl.lit("Viral detections"))
-          .alias("Molecular_Detection")
-    ).drop("RTi Category  FAP B or V (BV=B)")
+
+    # Take the contingency table for the PPA/NPA analysis (groups 1 and 2)
+    # from the shared counts
+    molecular_contingency = cohort_contingency(cohort_counts, "molecular")
 
     print("--- Molecular Detection Cohort ---")
-    print(f"Filtered down to {molecular_df.height} patients.")
+    print(f"Filtered down to {cohort_size(cohort_counts, 'molecular')} patients.")
     print("Final Contingency Table:")
     print(molecular_contingency)
     return (molecular_contingency,)
@@ -362,21 +462,21 @@ def _(df, pl):
 def _(mo):
     mo.md(
         r"""
-    **What this cell does:** This cell prepares the data and creates the contingency table for the molecular cohort in several steps:
+    **What this cell does:** This cell takes the contingency table for the molecular cohort from `cohort_counts`. The cohort is defined by `molecular_detection()` in `christina_paper/cohorts.py`:
 
-    *   **1\. Defines the Molecular Cohort (`molecular_df`):**
+    *   **1\. The Molecular Cohort:**
     
-        *   It filters the main `df` DataFrame to select all non-control patients (where `healthy_control` is `0`).
+        *   It selects all non-control patients (where `healthy_control` is `0`).
         
-        *   It includes only patients who have a valid molecular test result by keeping rows where `RTi Category FAP B or V (BV=B)` is `1` (Bacterial), `2` (Viral), or `3` (No Detection).
+        *   It includes only patients who have a valid molecular test result, i.e. where `RTi Category FAP B or V (BV=B)` is `1` (Bacterial), `2` (Viral), or `3` (No Detection).
         
-    *   **2\. Creates the Contingency Table (`molecular_contingency`):**
+    *   **2\. The Contingency Table (`molecular_contingency`):**
     
-        *   It takes the `molecular_df` from the step above and applies a second filter to keep only the 'Bacterial' (code `1`) and 'Viral' (code `2`) groups, because the 'No Detection' group is not part of the PPA/NPA analysis.
+        *   `cohort_contingency` keeps only the 'Bacterial' (code `1`) and 'Viral' (code `2`) groups, because the 'No Detection' group is not part of the PPA/NPA analysis.
         
-        *   It then groups this data by the molecular result and the `MeMed score category`, and counts the number of patients in each subgroup.
+        *   The table holds the number of patients in each molecular result and `MeMed score category` subgroup, counted in the shared pass over the data.
         
-        *   Finally, it adds a descriptive `Molecular_Detection` column to the table for clarity.
+        *   The molecular result is shown in a descriptive `Molecular_Detection` column for clarity.
         
 
     **Why we do it:** We do this to prepare the data for calculating the PPA and NPA for the molecular detection cohort. The filtering steps are necessary to isolate the specific patient population relevant to this analysis, as defined by the study's methodology. The resulting contingency table aggregates the data into the required format for the statistical calculations in the final step.
@@ -386,7 +486,7 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(molecular_contingency, pl, proportion_confint):
+def _(molecular_contingency, pl, wilson_interval):
     # --- PPA Calculation (Bacterial Detections) ---
     ppa_total_mol = molecular_contingency.filter(
         pl.col("Molecular_Detection") == "Bacterial detections"
@@ -397,7 +497,7 @@ def _(molecular_contingency, pl, proportion_confint):
         (pl.col("MeMed score category") == 1) # Bacterial score
     )["count"][0]
 
-    ppa_ci_mol = proportion_confint(count=ppa_success_mol, nobs=ppa_total_mol, alpha=0.05, method='wilson')
+    ppa_ci_mol = wilson_interval(count=ppa_success_mol, nobs=ppa_total_mol, alpha=0.05)
     print(f"PPA (Bacterial Detections): {ppa_success_mol / ppa_total_mol:.2%} (95% CI: {ppa_ci_mol[0]:.2%} - {ppa_ci_mol[1]:.2%})")
 
 
@@ -411,7 +511,7 @@ def _(molecular_contingency, pl, proportion_confint):
         (pl.col("MeMed score category") == 2) # Viral score
     )["count"][0]
 
-    npa_ci_mol = proportion_confint(count=npa_success_mol, nobs=npa_total_mol, alpha=0.05, method='wilson')
+    npa_ci_mol = wilson_interval(count=npa_success_mol, nobs=npa_total_mol, alpha=0.05)
     print(f"NPA (Viral Detections): {npa_success_mol / npa_total_mol:.2%} (95% CI: {npa_ci_mol[0]:.2%} - {npa_ci_mol[1]:.2%})")
     return
 
@@ -430,7 +530,7 @@ def _(mo):
         
         *   It finds the number of those patients who also had a 'Bacterial' MeMed score (`MeMed score category` is `1`).
         
-        *   It uses `proportion_confint` to calculate the 95% confidence interval for this proportion.
+        *   It uses `wilson_interval` to calculate the 95% confidence interval for this proportion.
         
     *   **For the NPA (Viral Detections):**
     
@@ -438,7 +538,7 @@ def _(mo):
         
         *   It finds the number of those patients who also had a 'Viral' MeMed score (`MeMed score category` is `2`).
         
-        *   It uses `proportion_confint` to calculate the 95% confidence interval for this proportion.
+        *   It uses `wilson_interval` to calculate the 95% confidence interval for this proportion.
         
 
     **Why we do it:** This cell performs the core statistical analysis for the molecular cohort, which is the final set of results needed to address the reviewer's feedback. Here, the PPA and NPA measure the test's agreement against molecular pathogen detection. This provides a different perspective on the test's performance compared to the clinical management benchmark and completes the primary goal of the analysis.
@@ -448,7 +548,7 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(proportion_confint):
+def _(wilson_interval):
     # --- Manually create the contingency table from the paper's Table 5 ---
     # Bacterial Detections (n=246): 217 Bacterial, 18 Viral, 11 Equivocal
     # Viral Detections (n=73): 40 Bacterial, 22 Viral, 11 Equivocal
@@ -456,7 +556,7 @@ def _(proportion_confint):
     # --- PPA Calculation (Bacterial Detections) ---
     ppa_success_paper = 217
     ppa_total_paper = 246
-    ppa_ci_paper = proportion_confint(count=ppa_success_paper, nobs=ppa_total_paper, alpha=0.05, method='wilson')
+    ppa_ci_paper = wilson_interval(count=ppa_success_paper, nobs=ppa_total_paper, alpha=0.05)
     print("--- CIs for the Exact Numbers in Paper's Table 5 ---")
     print(f"PPA (Bacterial Detections): {ppa_success_paper / ppa_total_paper:.2%} (95% CI: {ppa_ci_paper[0]:.2%} - {ppa_ci_paper[1]:.2%})")
 
@@ -464,7 +564,7 @@ def _(proportion_confint):
     # --- NPA Calculation (Viral Detections) ---
     npa_success_paper = 22
     npa_total_paper = 73
-    npa_ci_paper = proportion_confint(count=npa_success_paper, nobs=npa_total_paper, alpha=0.05, method='wilson')
+    npa_ci_paper = wilson_interval(count=npa_success_paper, nobs=npa_total_paper, alpha=0.05)
     print(f"NPA (Viral Detections): {npa_success_paper / npa_total_paper:.2%} (95% CI: {npa_ci_paper[0]:.2%} - {npa_ci_paper[1]:.2%})")
     return
 
@@ -496,6 +596,53 @@ def _(mo):
     return
 
 
+@app.cell(hide_code=True)
+def _(COHORTS, MOLECULAR_CLAUSES, TABLE_5_TARGETS, df, pl, reconcile):
+    # --- Which extra inclusion rules reproduce the paper's Table 5? ---
+    # A clause can only be tried if df has the columns it reads
+    _clauses = {
+        name: clause
+        for name, clause in MOLECULAR_CLAUSES.items()
+        if set(clause.meta.root_names()) <= set(df.columns)
+    }
+    if len(_clauses) < len(MOLECULAR_CLAUSES):
+        _skipped = sorted(MOLECULAR_CLAUSES.keys() - _clauses.keys())
+        print(f"Clauses skipped, their columns are not in the workbook: {_skipped}")
+
+    # All 2^k combinations of the candidate clauses, scored in one pass
+    table_5_rules = reconcile(
+        df,
+        COHORTS["molecular"].label,
+        _clauses,
+        TABLE_5_TARGETS,
+    )
+
+    with pl.Config(tbl_cols=-1, fmt_str_lengths=100, tbl_width_chars=200):
+        print("--- Inclusion rules ranked by their fit to Table 5 ---")
+        print(table_5_rules.head(5))
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ### Explanation
+
+    **What this cell does:** This cell searches for the inclusion rule that turns our 421-patient molecular cohort into the paper's Table 5 (246 bacterial detections: 217 / 18 / 11 bacterial / viral / equivocal scores; 73 viral detections: 40 / 22 / 11). `MOLECULAR_CLAUSES` (in `christina_paper/reconcile.py`) lists candidate extra conditions, such as "has a respiratory tract infection" (`CAP + RT infections` is `1`) or "FilmArray was done". `reconcile` tries every combination of them (2^6 = 64 rules) added to the cohort definition, and ranks the rules by how far their six counts are from the paper's (`abs_error`), simplest rule first.
+
+    *   Each patient gets one yes/no answer per clause, and a single `group_by` counts the patients per combination of answers, so all 64 rules are scored from one pass over the data in a few milliseconds.
+    
+    *   `exact_cells` is the number of the six Table 5 counts a rule reproduces exactly.
+    
+    *   The clauses read a few extra columns of `'full dataset'` (`CANDIDATE_SCHEMA`), which `df` holds when the workbook has them. A workbook without some of them (such as the synthetic benchmark data) only has the remaining clauses tried.
+    
+    **Why we do it:** We do this to explain, rather than hard-code, the difference between our cohort and the paper's. The best rule reproduces all six counts of Table 5 with a single extra condition: restricting the molecular cohort to patients with a respiratory tract infection (`CAP + RT infections` is `1`). This makes the hard-coded numbers in the previous cell traceable to the raw data.
+    """
+    )
+    return
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.md(r"""# 3. Comparison with and without equivocals""")
@@ -503,31 +650,44 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(proportion_confint):
-    # --- PPA Calculation (Equivocals Included) ---
-    # TP = 314, FN = 35 (18 viral + 17 equivocal)
-    ppa_total_with_eq = 314 + 35
-    ppa_success_with_eq = 314
-    ppa_ci_with_eq = proportion_confint(count=ppa_success_with_eq, nobs=ppa_total_with_eq, alpha=0.05, method='wilson')
+def _(agreement_metrics, cohort_counts):
+    # --- PPA and NPA of every cohort, with and without equivocals ---
+    # Computed from the cohort contingency tables in one vectorized pass
+    agreement = agreement_metrics(cohort_counts)
 
-    # --- NPA Calculation (Equivocals Included) ---
-    # TN = 41, FP = 52 (35 bacterial + 17 equivocal)
-    npa_total_with_eq = 41 + 52
-    npa_success_with_eq = 41
-    npa_ci_with_eq = proportion_confint(count=npa_success_with_eq, nobs=npa_total_with_eq, alpha=0.05, method='wilson')
+    agreement
+    return (agreement,)
 
 
-    print("--- CIs for Clinical Cohort (Including Equivocals, n=442) ---")
-    print(f"PPA: {ppa_success_with_eq / ppa_total_with_eq:.2%} (95% CI: {ppa_ci_with_eq[0]:.2%} - {ppa_ci_with_eq[1]:.2%})")
-    print(f"NPA: {npa_success_with_eq / npa_total_with_eq:.2%} (95% CI: {npa_ci_with_eq[0]:.2%} - {npa_ci_with_eq[1]:.2%})")
-    return (
-        npa_ci_with_eq,
-        npa_success_with_eq,
-        npa_total_with_eq,
-        ppa_ci_with_eq,
-        ppa_success_with_eq,
-        ppa_total_with_eq,
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    #### Explanation
+
+    **What this cell does:** This cell calls `agreement_metrics` (in `christina_paper/agreement.py`) on the `cohort_counts` table to compute the PPA and NPA of both cohorts, each in two variants: with equivocal MeMed results included and with them excluded. For each of the 8 results it stores the number of agreements (`successes`), the denominator (`total`), the point estimate and the 95% Wilson confidence interval in one table called `agreement`.
+
+    **Why we do it:** We do this so that every number in this section is derived from the data rather than typed in by hand. When the dataset is updated, re-running the notebook recomputes all four metric variants and their confidence intervals with no manual re-derivation. The following cells each display one part of this table.
+    """
     )
+    return
+
+
+@app.cell(hide_code=True)
+def _(cohort_counts, format_interval, pl, policy_metrics):
+    # --- PPA/NPA under every equivocal policy, from one count tensor ---
+    equivocal_policies = policy_metrics(cohort_counts)
+
+    with pl.Config(tbl_cols=-1, fmt_str_lengths=40, tbl_width_chars=200):
+        print("--- PPA/NPA (95% CI) by equivocal policy ---")
+        print(
+            equivocal_policies.select(
+                "policy",
+                pl.format("{} {}", "cohort", "metric").alias("result"),
+                format_interval().alias("value"),
+            ).pivot(on="result", index="policy", values="value")
+        )
+    return (equivocal_policies,)
 
 
 @app.cell(hide_code=True)
@@ -536,45 +696,69 @@ def _(mo):
         r"""
     #### Explanation
 
-    **What this cell does:** This cell calculates the PPA, NPA, and their 95% confidence intervals for the full clinical management cohort (n=442).
+    **What this cell does:** This cell computes the PPA and NPA of both cohorts under six ways of handling equivocal MeMed results (`policy_metrics` in `christina_paper/policies.py`):
 
-    *   **For the PPA:** It sets the True Positives (TP) to `314` and False Negatives (FN) to `35`. This FN count combines patients with both viral scores (18) and equivocal scores (17).
+    *   `included`: equivocals count as disagreement (the worst case for both metrics).
+    
+    *   `excluded`: equivocals are left out of the denominator.
+    
+    *   `as_positive` / `as_negative`: equivocals are read as a bacterial / viral result.
+    
+    *   `split`: each equivocal counts as half a bacterial and half a viral result.
     
-    *   **For the NPA:** It sets the True Negatives (TN) to `41` and False Positives (FP) to `52`. This FP count combines patients with both bacterial scores (35) and equivocal scores (17).
+    *   `best_case`: equivocals count as agreement for both metrics.
     
+    The counts of both cohorts are stored once as a small 3-dimensional array (cohort x reference group x MeMed score category), and each policy is one row of weights saying how much an equivocal result adds to the agreements and to the denominator. A single matrix product (`numpy.einsum`) applies every policy to every cohort at once. The `included` and `excluded` rows are the same numbers as in the `agreement` table.
 
-    **Why we do it:** This is the same primary analysis as done previously for the clinical cohort. In this scenario, an "equivocal" test result is treated as a test failure (i.e., it does not agree with the clinical management decision). This provides a measure of the test's performance in a real-world setting where non-definitive results must be handled.
+    **Why we do it:** Reviewers asked how sensitive the results are to the handling of equivocal results. The `included` and `best_case` rows bound the PPA and NPA, and the other policies show where common conventions fall in between. Adding another policy only needs one more row of weights in `POLICY_WEIGHTS`.
     """
     )
     return
 
 
 @app.cell(hide_code=True)
-def _(proportion_confint):
-    # --- PPA Calculation (Equivocals Excluded) ---
-    # TP = 314, FN = 18
-    ppa_total_no_eq = 314 + 18
-    ppa_success_no_eq = 314
-    ppa_ci_no_eq = proportion_confint(count=ppa_success_no_eq, nobs=ppa_total_no_eq, alpha=0.05, method='wilson')
+def _(agreement, pl):
+    # --- Clinical cohort, equivocals included (counted as disagreement) ---
+    clinical_with_eq = agreement.filter(
+        (pl.col("cohort") == "clinical") & (pl.col("equivocals") == "included")
+    )
 
-    # --- NPA Calculation (Equivocals Excluded) ---
-    # TN = 41, FP = 35
-    npa_total_no_eq = 41 + 35
-    npa_success_no_eq = 41
-    npa_ci_no_eq = proportion_confint(count=npa_success_no_eq, nobs=npa_total_no_eq, alpha=0.05, method='wilson')
+    print(f"--- CIs for Clinical Cohort (Including Equivocals, n={clinical_with_eq['total'].sum()}) ---")
+    for _row in clinical_with_eq.iter_rows(named=True):
+        print(f"{_row['metric']}: {_row['estimate']:.2%} (95% CI: {_row['ci_lower']:.2%} - {_row['ci_upper']:.2%})")
+    return
 
 
-    print("\n--- CIs for Clinical Cohort (Excluding Equivocals, n=408) ---")
-    print(f"PPA: {ppa_success_no_eq / ppa_total_no_eq:.2%} (95% CI: {ppa_ci_no_eq[0]:.2%} - {ppa_ci_no_eq[1]:.2%})")
-    print(f"NPA: {npa_success_no_eq / npa_total_no_eq:.2%} (95% CI: {npa_ci_no_eq[0]:.2%} - {npa_ci_no_eq[1]:.2%})")
-    return (
-        npa_ci_no_eq,
-        npa_success_no_eq,
-        npa_total_no_eq,
-        ppa_ci_no_eq,
-        ppa_success_no_eq,
-        ppa_total_no_eq,
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    #### Explanation
+
+    **What this cell does:** This cell shows the PPA, NPA, and their 95% confidence intervals for the full clinical management cohort (n=442).
+
+    *   **For the PPA:** The True Positives (TP) are the `314` bacterially managed patients with a bacterial score. The False Negatives (FN) are the `35` patients with either a viral score (18) or an equivocal score (17).
+    
+    *   **For the NPA:** The True Negatives (TN) are the `41` virally managed patients with a viral score. The False Positives (FP) are the `52` patients with either a bacterial score (35) or an equivocal score (17).
+    
+
+    **Why we do it:** This is the same primary analysis as done previously for the clinical cohort. In this scenario, an "equivocal" test result is treated as a test failure (i.e., it does not agree with the clinical management decision). This provides a measure of the test's performance in a real-world setting where non-definitive results must be handled.
+    """
     )
+    return
+
+
+@app.cell(hide_code=True)
+def _(agreement, pl):
+    # --- Clinical cohort, equivocals excluded ---
+    clinical_no_eq = agreement.filter(
+        (pl.col("cohort") == "clinical") & (pl.col("equivocals") == "excluded")
+    )
+
+    print(f"\n--- CIs for Clinical Cohort (Excluding Equivocals, n={clinical_no_eq['total'].sum()}) ---")
+    for _row in clinical_no_eq.iter_rows(named=True):
+        print(f"{_row['metric']}: {_row['estimate']:.2%} (95% CI: {_row['ci_lower']:.2%} - {_row['ci_upper']:.2%})")
+    return
 
 
 @app.cell(hide_code=True)
@@ -583,7 +767,7 @@ def _(mo):
         r"""
     #### Explanation
 
-    **What this cell does:** This cell recalculates the PPA, NPA, and their confidence intervals for a subset of the clinical cohort (n=408) that excludes the 34 patients who had equivocal test results.
+    **What this cell does:** This cell shows the PPA, NPA, and their confidence intervals for a subset of the clinical cohort (n=408) that excludes the 34 patients who had equivocal test results.
 
     *   **For the PPA:** The FN count is now `18` (only patients with a viral score).
     
@@ -597,31 +781,16 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(proportion_confint):
-    # --- PPA Calculation (Equivocals Included) ---
-    # From Table 5: TP = 217, FN = 18 (viral score) + 11 (equivocal score) = 29
-    ppa_total_with_eq_mol = 217 + 29
-    ppa_success_with_eq_mol = 217
-    ppa_ci_with_eq_mol = proportion_confint(count=ppa_success_with_eq_mol, nobs=ppa_total_with_eq_mol, alpha=0.05, method='wilson')
-
-    # --- NPA Calculation (Equivocals Included) ---
-    # From Table 5: TN = 22, FP = 40 (bacterial score) + 11 (equivocal score) = 51
-    npa_total_with_eq_mol = 22 + 51
-    npa_success_with_eq_mol = 22
-    npa_ci_with_eq_mol = proportion_confint(count=npa_success_with_eq_mol, nobs=npa_total_with_eq_mol, alpha=0.05, method='wilson')
-
+def _(agreement, pl):
+    # --- Molecular cohort, equivocals included (counted as disagreement) ---
+    molecular_with_eq = agreement.filter(
+        (pl.col("cohort") == "molecular") & (pl.col("equivocals") == "included")
+    )
 
     print("--- CIs for Molecular Cohort (Including Equivocals) ---")
-    print(f"PPA (Bacterial Detections): {ppa_success_with_eq_mol / ppa_total_with_eq_mol:.2%} (95% CI: {ppa_ci_with_eq_mol[0]:.2%} - {ppa_ci_with_eq_mol[1]:.2%})")
-    print(f"NPA (Viral Detections): {npa_success_with_eq_mol / npa_total_with_eq_mol:.2%} (95% CI: {npa_ci_with_eq_mol[0]:.2%} - {npa_ci_with_eq_mol[1]:.2%})")
-    return (
-        npa_ci_with_eq_mol,
-        npa_success_with_eq_mol,
-        npa_total_with_eq_mol,
-        ppa_ci_with_eq_mol,
-        ppa_success_with_eq_mol,
-        ppa_total_with_eq_mol,
-    )
+    for _row in molecular_with_eq.iter_rows(named=True):
+        print(f"{_row['metric']} ({_row['reference_group']}): {_row['estimate']:.2%} (95% CI: {_row['ci_lower']:.2%} - {_row['ci_upper']:.2%})")
+    return
 
 
 @app.cell(hide_code=True)
@@ -630,45 +799,30 @@ def _(mo):
         r"""
     #### Explanation
 
-    **What this cell does:** This cell calculates the PPA, NPA, and their 95% confidence intervals for the molecular detection cohort, using the numbers from the paper's Table 5.
+    **What this cell does:** This cell shows the PPA, NPA, and their 95% confidence intervals for the molecular detection cohort, computed from the `molecular_contingency` counts.
 
-    *   **For the PPA:** The FN count of `29` combines patients with viral scores (18) and equivocal scores (11).
+    *   **For the PPA:** The FN count combines bacterial detections with viral scores and with equivocal scores.
     
-    *   **For the NPA:** The FP count of `51` combines patients with bacterial scores (40) and equivocal scores (11).
+    *   **For the NPA:** The FP count combines viral detections with bacterial scores and with equivocal scores.
     
 
-    **Why we do it:** This is the same primary analysis as done previously for the molecular cohort. An "equivocal" result is treated as a test failure against the molecular benchmark. This provides a measure of the test's performance against pathogen detection for all patients in this cohort.
+    **Why we do it:** This is the same primary analysis as done previously for the molecular cohort. An "equivocal" result is treated as a test failure against the molecular benchmark. This provides a measure of the test's performance against pathogen detection for all patients in this cohort. Note that these numbers come from filtering the raw dataset, which (as discussed in section 2) does not exactly reproduce the paper's Table 5 (TP = 217, FN = 29; TN = 22, FP = 51).
     """
     )
     return
 
 
 @app.cell(hide_code=True)
-def _(proportion_confint):
-    # --- PPA Calculation (Equivocals Excluded) ---
-    # From Table 5: TP = 217, FN = 18 (viral score only)
-    ppa_total_no_eq_mol = 217 + 18
-    ppa_success_no_eq_mol = 217
-    ppa_ci_no_eq_mol = proportion_confint(count=ppa_success_no_eq_mol, nobs=ppa_total_no_eq_mol, alpha=0.05, method='wilson')
-
-    # --- NPA Calculation (Equivocals Excluded) ---
-    # From Table 5: TN = 22, FP = 40 (bacterial score only)
-    npa_total_no_eq_mol = 22 + 40
-    npa_success_no_eq_mol = 22
-    npa_ci_no_eq_mol = proportion_confint(count=npa_success_no_eq_mol, nobs=npa_total_no_eq_mol, alpha=0.05, method='wilson')
-
+def _(agreement, pl):
+    # --- Molecular cohort, equivocals excluded ---
+    molecular_no_eq = agreement.filter(
+        (pl.col("cohort") == "molecular") & (pl.col("equivocals") == "excluded")
+    )
 
     print("\n--- CIs for Molecular Cohort (Excluding Equivocals) ---")
-    print(f"PPA (Bacterial Detections): {ppa_success_no_eq_mol / ppa_total_no_eq_mol:.2%} (95% CI: {ppa_ci_no_eq_mol[0]:.2%} - {ppa_ci_no_eq_mol[1]:.2%})")
-    print(f"NPA (Viral Detections): {npa_success_no_eq_mol / npa_total_no_eq_mol:.2%} (95% CI: {npa_ci_no_eq_mol[0]:.2%} - {npa_ci_no_eq_mol[1]:.2%})")
-    return (
-        npa_ci_no_eq_mol,
-        npa_success_no_eq_mol,
-        npa_total_no_eq_mol,
-        ppa_ci_no_eq_mol,
-        ppa_success_no_eq_mol,
-        ppa_total_no_eq_mol,
-    )
+    for _row in molecular_no_eq.iter_rows(named=True):
+        print(f"{_row['metric']} ({_row['reference_group']}): {_row['estimate']:.2%} (95% CI: {_row['ci_lower']:.2%} - {_row['ci_upper']:.2%})")
+    return
 
 
 @app.cell(hide_code=True)
@@ -677,11 +831,11 @@ def _(mo):
         r"""
     #### Explanation
 
-    **What this cell does:** This cell recalculates the PPA, NPA, and their confidence intervals for the subset of the molecular cohort that excludes patients with equivocal test results.
+    **What this cell does:** This cell shows the PPA, NPA, and their confidence intervals for the subset of the molecular cohort that excludes patients with equivocal test results.
 
-    *   **For the PPA:** The FN count is now `18`.
+    *   **For the PPA:** The FN count now only includes bacterial detections with a viral score.
     
-    *   **For the NPA:** The FP count is now `40`.
+    *   **For the NPA:** The FP count now only includes viral detections with a bacterial score.
     
 
     **Why we do it:** This is the corresponding sensitivity analysis for the molecular cohort. It assesses the test's performance only on cases with a definitive result against the molecular benchmark, allowing for a direct comparison to the primary analysis to understand the impact of equivocal results in this context.
@@ -691,66 +845,9 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(
-    npa_ci_no_eq,
-    npa_ci_no_eq_mol,
-    npa_ci_with_eq,
-    npa_ci_with_eq_mol,
-    npa_success_no_eq,
-    npa_success_no_eq_mol,
-    npa_success_with_eq,
-    npa_success_with_eq_mol,
-    npa_total_no_eq,
-    npa_total_no_eq_mol,
-    npa_total_with_eq,
-    npa_total_with_eq_mol,
-    pl,
-    ppa_ci_no_eq,
-    ppa_ci_no_eq_mol,
-    ppa_ci_with_eq,
-    ppa_ci_with_eq_mol,
-    ppa_success_no_eq,
-    ppa_success_no_eq_mol,
-    ppa_success_with_eq,
-    ppa_success_with_eq_mol,
-    ppa_total_no_eq,
-    ppa_total_no_eq_mol,
-    ppa_total_with_eq,
-    ppa_total_with_eq_mol,
-):
-    # This cell assumes the previous calculation cells have been run and their
-    # variables (ppa_ci_with_eq, npa_ci_no_eq_mol, etc.) are in memory.
-
-    # Create a list of dictionaries, programmatically building the strings from our variables
-    summary_data = [
-        {
-            "Cohort": "Clinical Management",
-            "Metric": "PPA",
-            "Including Equivocals": f"{(ppa_success_with_eq / ppa_total_with_eq):.2%} (95% CI: {ppa_ci_with_eq[0]:.2%} - {ppa_ci_with_eq[1]:.2%})",
-            "Excluding Equivocals": f"{(ppa_success_no_eq / ppa_total_no_eq):.2%} (95% CI: {ppa_ci_no_eq[0]:.2%} - {ppa_ci_no_eq[1]:.2%})",
-        },
-        {
-            "Cohort": "Clinical Management",
-            "Metric": "NPA",
-            "Including Equivocals": f"{(npa_success_with_eq / npa_total_with_eq):.2%} (95% CI: {npa_ci_with_eq[0]:.2%} - {npa_ci_with_eq[1]:.2%})",
-            "Excluding Equivocals": f"{(npa_success_no_eq / npa_total_no_eq):.2%} (95% CI: {npa_ci_no_eq[0]:.2%} - {npa_ci_no_eq[1]:.2%})",
-        },
-        {
-            "Cohort": "Molecular Detection",
-            "Metric": "PPA",
-            "Including Equivocals": f"{(ppa_success_with_eq_mol / ppa_total_with_eq_mol):.2%} (95% CI: {ppa_ci_with_eq_mol[0]:.2%} - {ppa_ci_with_eq_mol[1]:.2%})",
-            "Excluding Equivocals": f"{(ppa_success_no_eq_mol / ppa_total_no_eq_mol):.2%} (95% CI: {ppa_ci_no_eq_mol[0]:.2%} - {ppa_ci_no_eq_mol[1]:.2%})",
-        },
-        {
-            "Cohort": "Molecular Detection",
-            "Metric": "NPA",
-            "Including Equivocals": f"{(npa_success_with_eq_mol / npa_total_with_eq_mol):.2%} (95% CI: {npa_ci_with_eq_mol[0]:.2%} - {npa_ci_with_eq_mol[1]:.2%})",
-            "Excluding Equivocals": f"{(npa_success_no_eq_mol / npa_total_no_eq_mol):.2%} (95% CI: {npa_ci_no_eq_mol[0]:.2%} - {npa_ci_no_eq_mol[1]:.2%})",
-        },
-    ]
-
-    # Create and display the summary DataFrame
-    summary_df = pl.DataFrame(summary_data)
+def _(agreement, agreement_summary):
+    # Build the formatted strings from the numeric 'agreement' table, for display only
+    summary_df = agreement_summary(agreement)
 
     print("--- Comparison of Performance Metrics ---")
     print(summary_df)
@@ -761,9 +858,46 @@ def _(
 def _(mo):
     mo.md(
         r"""
-    **What this cell does:** This cell gathers the results stored in the various `ppa_*` and `npa_*` variables from all the previous calculation steps. It uses f-strings to format these results into readable strings (percentage and confidence interval). Finally, it organizes this formatted data into a `polars` DataFrame to create a clean, side-by-side comparison table.
+    **What this cell does:** This cell gathers the results stored in the `agreement` table computed at the start of this section. `agreement_summary` (in `christina_paper/presentation.py`) formats them into readable strings (percentage and confidence interval) and organizes them into a `polars` DataFrame to create a clean, side-by-side comparison table.
+
+    **Why we do it:** We do this to create a **dynamic and reproducible** summary of the entire analysis. The strings are only built here, for display: the `agreement` table itself keeps plain numbers, and a headless run (`python main.py run`) writes it, along with the other result tables and the patients of each cohort, to Arrow files in `<out>/arrow/` that other programs (e.g. a dashboard) can read directly without re-running the notebook.
+    """
+    )
+    return
+
+
+@app.cell(hide_code=True)
+def _(bootstrap_agreement, df, joint_counts):
+    # --- Bootstrap CIs (100,000 replicates) for every PPA/NPA variant ---
+    # Patients are resampled jointly for both cohorts, so differences are paired
+    bootstrap_metrics, bootstrap_differences = bootstrap_agreement(
+        joint_counts(df).collect(),
+        replicates=100_000,
+        seed=0
+    )
+
+    print("--- Bootstrap 95% CIs ---")
+    print(bootstrap_metrics)
+    print("\n--- Paired differences (bootstrap 95% CIs) ---")
+    print(bootstrap_differences)
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    #### Explanation
+
+    **What this cell does:** This cell computes percentile bootstrap 95% confidence intervals for all eight PPA/NPA results of this section, plus confidence intervals for paired differences between them:
+
+    *   **With vs. without equivocals**, for each cohort and metric.
+    
+    *   **Clinical vs. molecular cohort**, for each metric and equivocal policy.
+    
+    Each of the 100,000 bootstrap replicates resamples the patients with replacement. Since resampling only changes how many patients fall in each cell of the combined contingency table (`joint_counts`), each replicate is drawn as a single multinomial sample of those cell counts rather than a copy of the patient rows (see `christina_paper/bootstrap.py`). The same resampled patients are used for every metric, which is what makes the differences paired. The fixed `seed` makes the results reproducible.
 
-    **Why we do it:** We do this to create a **dynamic and reproducible** summary of the entire analysis.
+    **Why we do it:** Reviewers asked for an uncertainty method other than the Wilson interval, and for confidence intervals on differences between the results, for example whether the PPA changes significantly when equivocals are excluded. The bootstrap intervals should be close to the Wilson intervals above; a difference whose interval excludes zero indicates a real change.
     """
     )
     return
@@ -776,23 +910,43 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(proportion_confint):
+def _(descriptive_proportions, df):
+    # --- Every descriptive proportion in one pass over df, with Wilson CIs ---
+    # See DESCRIPTIVE_PROPORTIONS in christina_paper/agreement.py
+    descriptive = descriptive_proportions(df)
+
+    descriptive
+    return (descriptive,)
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ### Explanation
+
+    **What this cell does:** This cell calls `descriptive_proportions` to count, for each proportion quoted in the paper's descriptive tables, the patients in the relevant group (`total`) and those with the relevant MeMed result (`successes`). It then adds the point estimate and the 95% Wilson confidence interval. The definition of each proportion is listed in `DESCRIPTIVE_PROPORTIONS` in `christina_paper/agreement.py`.
+
+    **Why we do it:** We do this so the counts behind every confidence interval in this section are derived from `df` instead of being copied from the paper's tables. All proportions are computed in a single pass over the data; the following cells each display one of them.
+    """
+    )
+    return
+
+
+@app.cell(hide_code=True)
+def _(descriptive, pl):
     # --- For the "Bacterial management" group ---
-    n_success_bact = 4
-    n_total_bact = 349
-    ci_bact = proportion_confint(count=n_success_bact, nobs=n_total_bact, method='wilson')
+    bact_high_viral = descriptive.filter(pl.col("name") == "table1_bacterial_high_viral").row(0, named=True)
     print(f"Bacterial Management Group (High Likelihood Viral Score):")
-    print(f"Point Estimate: {n_success_bact / n_total_bact:.1%}")
-    print(f"95% CI: {ci_bact[0]:.1%} - {ci_bact[1]:.1%}")
+    print(f"Point Estimate: {bact_high_viral['estimate']:.1%}")
+    print(f"95% CI: {bact_high_viral['ci_lower']:.1%} - {bact_high_viral['ci_upper']:.1%}")
 
 
     # --- For the "Viral/non-bacterial management" group ---
-    n_success_viral = 21
-    n_total_viral = 93
-    ci_viral = proportion_confint(count=n_success_viral, nobs=n_total_viral, method='wilson')
+    viral_high_viral = descriptive.filter(pl.col("name") == "table1_viral_high_viral").row(0, named=True)
     print(f"\nViral/Non-bacterial Management Group (High Likelihood Viral Score):")
-    print(f"Point Estimate: {n_success_viral / n_total_viral:.1%}")
-    print(f"95% CI: {ci_viral[0]:.1%} - {ci_viral[1]:.1%}")
+    print(f"Point Estimate: {viral_high_viral['estimate']:.1%}")
+    print(f"95% CI: {viral_high_viral['ci_lower']:.1%} - {viral_high_viral['ci_upper']:.1%}")
 
     return
 
@@ -803,32 +957,32 @@ def _(mo):
         r"""
     ### Explanation
 
-    **What this cell does:** This cell calculates the 95% confidence intervals for a specific data point presented in the descriptive tables: the percentage of patients with a "High likelihood viral infection" score, stratified by management group.
+    **What this cell does:** This cell shows the 95% confidence intervals for a specific data point presented in the descriptive tables: the percentage of patients with a "High likelihood viral infection" score (`Score_Memed_intervals` is `1`, a score of 0-10), stratified by management group.
 
     *   **For the "Bacterial management" group:**
     
-        *   It uses the raw counts from Table 1, where `n=4` out of a total `N=349`.
+        *   The counts match Table 1, where `n=4` out of a total `N=349`.
         
-        *   It calls `proportion_confint` to compute the CI for the proportion 4/349.
+        *   The CI is computed for the proportion 4/349.
         
     *   **For the "Viral/non-bacterial management" group:**
     
-        *   It uses the raw counts from Table 1, where `n=21` out of a total `N=93`.
+        *   The counts match Table 1, where `n=21` out of a total `N=93`.
         
-        *   It computes the CI for the proportion 21/93.
+        *   The CI is computed for the proportion 21/93.
         
 
-    **Why we do it:** We do this to apply the reviewer's feedback on "uncertainty quantification" to the descriptive tables in a thorough manner. While not the primary performance metrics, the rows describing the MeMed test's results in Table 1 and Table 4 can be considered performance-related statistics. This calculation provides the required confidence intervals, making the tables more statistically robust. This code serves as a template that can be repeated for the other relevant rows to fully address the reviewer's comment.
+    **Why we do it:** We do this to apply the reviewer's feedback on "uncertainty quantification" to the descriptive tables in a thorough manner. While not the primary performance metrics, the rows describing the MeMed test's results in Table 1 and Table 4 can be considered performance-related statistics. This calculation provides the required confidence intervals, making the tables more statistically robust. Further rows can be covered by adding their definition to `DESCRIPTIVE_PROPORTIONS`.
     """
     )
     return
 
 
 @app.cell(hide_code=True)
-def _(proportion_confint):
+def _(descriptive, pl):
     # For Table 3, "Bacterial management" group, "Bacterial [%]" row
-    ci_table3 = proportion_confint(count=15, nobs=22, method='wilson')
-    print(f"68.2% (95% CI: {ci_table3[0]:.1%} - {ci_table3[1]:.1%})")
+    table3 = descriptive.filter(pl.col("name") == "table3_bacterial_bacterial_score").row(0, named=True)
+    print(f"{table3['estimate']:.1%} (95% CI: {table3['ci_lower']:.1%} - {table3['ci_upper']:.1%})")
     return
 
 
@@ -836,7 +990,7 @@ def _(proportion_confint):
 def _(mo):
     mo.md(
         r"""
-    **What this cell does:** This cell calculates the 95% confidence interval for a specific proportion from Table 3. It uses the raw counts of patients who were ultimately diagnosed as non-infectious but were managed as "bacterial" (`N=22`), and of those, the number who received a "bacterial" MeMed score (`n=15`).
+    **What this cell does:** This cell shows the 95% confidence interval for a specific proportion from Table 3. It uses the counts of patients who were ultimately diagnosed as non-infectious (`UTDIAGN` is pulmonary embolism, heart failure, non-infectious COPD/asthma exacerbation or other) but were managed as "bacterial" (`N=22`), and of those, the number who received a "bacterial" MeMed score (`n=15`).
 
     **Why we do it:** We do this to add uncertainty quantification to the subgroup analysis in Table 3. This table assesses the test's performance in patients without a final infectious diagnosis, making it important to quantify the statistical certainty of these results to fully address the reviewer's feedback.
     """
@@ -845,10 +999,10 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(proportion_confint):
+def _(descriptive, pl):
     # For Supplementary Table 1, "Moderate likelihood of viral infection" row
-    ci_supp1 = proportion_confint(count=13, nobs=20, method='wilson')
-    print(f"65.0% (95% CI: {ci_supp1[0]:.1%} - {ci_supp1[1]:.1%})")
+    supp1 = descriptive.filter(pl.col("name") == "supp1_controls_moderate_viral").row(0, named=True)
+    print(f"{supp1['estimate']:.1%} (95% CI: {supp1['ci_lower']:.1%} - {supp1['ci_upper']:.1%})")
     return
 
 
@@ -856,7 +1010,7 @@ def _(proportion_confint):
 def _(mo):
     mo.md(
         r"""
-    **What this cell does:** This cell calculates the 95% confidence interval for a proportion from Supplementary Table 1. It uses the raw counts of healthy controls (N=20) and the number of those who received a "Moderate likelihood of viral infection" score (n=13).
+    **What this cell does:** This cell shows the 95% confidence interval for a proportion from Supplementary Table 1. It uses the counts of healthy controls (N=20) and the number of those who received a "Moderate likelihood of viral infection" score (`Score_Memed_intervals` is `2`, n=13).
 
     **Why we do it:** We do this to add statistical rigor to the data describing the test's behavior in the healthy control group. Providing a CI quantifies the uncertainty around the 65% point estimate, which is a key measure of the test's baseline performance in a non-diseased population.
     """
@@ -865,10 +1019,10 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(proportion_confint):
+def _(descriptive, pl):
     # For Supplementary Table 2, "Bacterial management" group, "Bacterial MeMed BV® test scores [%]" row
-    ci_supp2 = proportion_confint(count=55, nobs=60, method='wilson')
-    print(f"91.7% (95% CI: {ci_supp2[0]:.1%} - {ci_supp2[1]:.1%})")
+    supp2 = descriptive.filter(pl.col("name") == "supp2_bacterial_bacterial_score").row(0, named=True)
+    print(f"{supp2['estimate']:.1%} (95% CI: {supp2['ci_lower']:.1%} - {supp2['ci_upper']:.1%})")
     return
 
 
@@ -876,7 +1030,7 @@ def _(proportion_confint):
 def _(mo):
     mo.md(
         r"""
-    **What this cell does:** This cell calculates the 95% confidence interval for a proportion from Supplementary Table 2. It uses the raw counts of patients with "no microbial detections" who were still managed as "bacterial" (`N=60`), and of those, the number who received a "bacterial" MeMed score (`n=55`).
+    **What this cell does:** This cell shows the 95% confidence interval for a proportion from Supplementary Table 2. It uses the counts of patients with "no microbial detections" (`RTi Category` is `3`) who were still managed as "bacterial" (`N=60`), and of those, the number who received a "bacterial" MeMed score (`n=55`).
 
     **Why we do it:** We do this to add uncertainty quantification to the important subgroup of patients where no pathogen could be found. Understanding the confidence in the test's performance in this ambiguous group is critical, and this calculation provides that necessary statistical context.
     """
@@ -884,6 +1038,340 @@ def _(mo):
     return
 
 
+@app.cell(hide_code=True)
+def _(SUPPLEMENT_FILE, df, excel_file_path, os, verify_supplement):
+    # --- Published supplementary cells that df does not reproduce ---
+    # The workbook ships next to the dataset; see christina_paper/verify.py
+    _supplement_path = os.path.join(os.path.dirname(excel_file_path), SUPPLEMENT_FILE)
+    if os.path.exists(_supplement_path):
+        supplement_check = verify_supplement(df, _supplement_path)
+    else:
+        print(f"No supplementary tables next to the dataset ({_supplement_path})")
+        supplement_check = None
+
+    supplement_check
+    return (supplement_check,)
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ### Explanation
+
+    **What this cell does:** This cell reads 'Supplementary Table 1 and 2.xlsx' and recomputes each of its numbers from `df`:
+
+    *   **Supplementary Table 1:** the age, sex and MeMed score band of the healthy controls and of the suspected CAP patients.
+    
+    *   **Supplementary Table 2:** the listed patients without molecular detections, counted by diagnosis and score band, and their median score, per management group. The same counts are made for the patients with `RTi Category` `3` in `df`.
+    
+
+    Both sets of numbers are joined on (table, row, group), and the table shows every cell that differs by more than the published rounding (for example 42.3% allows 42.25% to 42.35%). The `note` column explains the differences that were traced to the published table; a null `note` marks a new discrepancy.
+
+    **Why we do it:** We do this so the counts used above (13/20 for Supplementary Table 1 and 55/60 for Supplementary Table 2) are checked against the whole published tables, not just quoted from them. The same check runs on every headless run (`main.py run`) and stops it before the results are exported if an unexplained discrepancy appears.
+    """
+    )
+    return
+
+
+@app.cell(hide_code=True)
+def _(descriptive, pl, proportion_interval):
+    # --- Exact and mid-p CIs next to the Wilson CIs, one vectorized call per method ---
+    _successes = descriptive["successes"].to_numpy()
+    _total = descriptive["total"].to_numpy()
+    _exact_lower, _exact_upper = proportion_interval(_successes, _total, method="clopper-pearson")
+    _mid_p_lower, _mid_p_upper = proportion_interval(_successes, _total, method="mid-p")
+
+    descriptive_exact = descriptive.with_columns(
+        exact_lower=pl.Series(_exact_lower),
+        exact_upper=pl.Series(_exact_upper),
+        mid_p_lower=pl.Series(_mid_p_lower),
+        mid_p_upper=pl.Series(_mid_p_upper),
+    )
+
+    descriptive_exact
+    return (descriptive_exact,)
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ### Explanation
+
+    **What this cell does:** This cell adds two further 95% confidence intervals to each descriptive proportion, next to the Wilson interval:
+
+    *   `exact_lower`/`exact_upper`: the exact Clopper-Pearson interval, which is built from the binomial distribution itself and never covers less than 95%.
+    
+    *   `mid_p_lower`/`mid_p_upper`: the mid-p interval, a less conservative version of the exact interval whose coverage is close to 95% on average.
+    
+    For groups of up to 500 patients, both intervals are read from a table precomputed once and stored in `.cache/intervals/`, so they cost no more than the Wilson interval.
+
+    **Why we do it:** Several of the descriptive proportions rest on small groups (20 healthy controls, 22 non-infectious patients) or on counts close to zero (4/349). In that setting the approximations behind the Wilson interval are weakest, and reviewers often expect an exact interval. Reporting all three shows whether the conclusions depend on the choice of method.
+    """
+    )
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md(r"""# 5. Subgroup analysis""")
+    return
+
+
+@app.cell(hide_code=True)
+def _(cube, df, pl, stratified_agreement):
+    # --- PPA/NPA for every subgroup, from one pass over df ---
+    # cube("age_band", "sex") = overall, age band x sex, age band, sex
+    subgroup_agreement = stratified_agreement(df, grouping_sets=[*cube("age_band", "sex"), ("season",)])
+
+    subgroup_agreement.filter(pl.col("equivocals") == "included")
+    return (subgroup_agreement,)
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ### Explanation
+
+    **What this cell does:** This cell computes the PPA and NPA, with 95% Wilson confidence intervals, of both cohorts within subgroups of patients:
+
+    *   `age_band`: under 65, 65-79 and 80 or older (from `AGE`).
+    
+    *   `sex`: female or male (from `SEX`).
+    
+    *   `season`: winter, spring, summer or autumn of the admission date (from `PITIDINNKOMST`).
+    
+    Each requested breakdown (a "grouping set") is one value of the `grouping` column; the stratum columns that a breakdown does not use are empty. `cube("age_band", "sex")` asks for the overall result, each variable alone, and every age band x sex combination. The table shown keeps the rows with equivocal results included; the full table also has them excluded.
+
+    **Why we do it:** Reviewers commonly ask whether the test agrees equally well across patient subgroups. Rather than re-running the cohort cells once per subgroup, the data is counted once at the finest level (every age band, sex and season) and each breakdown is added up from those counts. Note that many subgroups are small, so their confidence intervals are wide.
+    """
+    )
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md(r"""# 6. Threshold sweep of the continuous score""")
+    return
+
+
+@app.cell(hide_code=True)
+def _(df, threshold_sweep):
+    # --- PPA/NPA at every cut-off of Score_Memed, and the AUC, for both cohorts ---
+    roc_curves, roc_aucs = threshold_sweep(df)
+
+    roc_aucs
+    return roc_aucs, roc_curves
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ### Explanation
+
+    **What this cell does:** The MeMed score categories cut the continuous 0-100 score (`Score_Memed`) at fixed points: 66 or above is "bacterial", 34 or below is "viral". This cell instead evaluates every possible cut-off. For each cohort, the patients in the bacterial and viral reference groups are sorted once by score, and for each threshold a patient counts as "bacterial" when their score is at least that threshold. This gives:
+
+    *   `roc_curves`: the counts, PPA and NPA (with 95% Wilson CIs) at every threshold, i.e. the ROC curve.
+    
+    *   `roc_aucs` (shown): the area under the ROC curve for each cohort, with a 95% confidence interval from DeLong's method.
+    
+    **Why we do it:** The PPA/NPA depend on where the score is cut. The AUC summarizes how well the score separates the two reference groups over all cut-offs, and the curve shows what PPA/NPA other cut-offs would give. The PPA at a threshold of 66 reproduces the Section 2 PPA, and the NPA at 35 reproduces the Section 2 NPA.
+    """
+    )
+    return
+
+
+@app.cell(hide_code=True)
+def _(curve_at, roc_curves):
+    # The paper's cut-offs: >= 66 is a bacterial score, >= 35 is not a viral score
+    curve_at(roc_curves, [35.0, 66.0])
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md(r"""# 7. Ad-hoc cohort counts""")
+    return
+
+
+@app.cell(hide_code=True)
+def _(BitmapIndex, df, pl):
+    # --- Bitmap index of df: one packed bitset per (column, value), built once ---
+    patient_index = BitmapIndex.from_frame(df)
+
+    # What-if: the clinical cohort's contingency table within each RTi category
+    _rti = "RTi Category  FAP B or V (BV=B)"
+    rti_contingency = pl.concat([
+        patient_index.crosstab("clinical", "MeMed score category", within=patient_index.bits(_rti, _category))
+        .drop_nulls("clinical")
+        .select(pl.lit(_category, dtype=patient_index.schema[_rti]).alias(_rti), pl.all())
+        for _category in patient_index.values(_rti)
+        if _category is not None
+    ])
+
+    rti_contingency
+    return (patient_index,)
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ### Explanation
+
+    **What this cell does:** This cell builds `patient_index`, a bitmap index of `df` (see `christina_paper/bitmap.py`). For every value of every column the cohort rules use (`healthy_control`, `AB 72t`, `Oppst AB 48t`, `MeMed score category`, `RTi Category  FAP B or V (BV=B)`), and for every reference group of each cohort (`clinical`, `molecular`), it stores one bit per patient: 1 if the patient has that value, 0 otherwise. As an example, it then splits the clinical cohort's contingency table by RTi category (`rti_contingency`).
+
+    *   `patient_index.bits(column, value)` gives the patients with that value; combine them with `&` (and), `|` (or) and `patient_index.invert(...)` (not).
+    
+    *   `patient_index.count(bits)` counts the patients, and `patient_index.crosstab(a, b, within=bits)` counts every combination of two columns, optionally within a group of patients.
+    
+    *   `patient_index.mask(bits)` turns a result back into a row filter, e.g. `df.filter(patient_index.mask(bits))`.
+    
+    **Why we do it:** Exploring "what if" cohorts (e.g. "bacterial management, equivocal score, not a lower respiratory infection") otherwise means filtering the whole table for each question. With the index, each question is a few bitwise operations on 8 patients per byte, which takes microseconds, so thousands of combinations can be tried interactively.
+    """
+    )
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md(r"""# 8. Forest plot of all confidence intervals""")
+    return
+
+
+@app.cell(hide_code=True)
+def _(
+    agreement,
+    descriptive,
+    equivocal_policies,
+    forest_plot,
+    forest_points,
+    pl,
+    subgroup_agreement,
+):
+    # --- One point and interval per computed CI; only these points go into the chart ---
+    forest_data = forest_points({
+        "Sections 2-3: agreement": agreement,
+        "Section 3: equivocal policies": equivocal_policies,
+        "Section 4: descriptive": descriptive,
+        # The overall rows repeat the agreement table
+        "Section 5: subgroups": subgroup_agreement.filter(pl.col("grouping") != "overall"),
+    })
+
+    forest_plot(forest_data)
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ### Explanation
+
+    **What this cell does:** This cell draws a forest plot of every confidence interval computed above: the PPA/NPA of both cohorts (with and without equivocals, and under each equivocal policy), the descriptive proportions of Section 4 and the subgroup PPA/NPA of Section 5. Each row shows one estimate (dot) and its 95% confidence interval (line), with one panel per section and metric.
+
+    *   `forest_points` (in `christina_paper/plots.py`) first stacks the result tables into one small table, `forest_data`, with a row per interval and only the columns the plot needs.
+    
+    *   `forest_plot` then draws it with `altair`. Only `forest_data` is stored in the chart, as a compact CSV text, never the patient-level data.
+    
+    **Why we do it:** A forest plot makes it easy to compare many intervals at a glance, e.g. how much wider the subgroup intervals are than the overall ones. `altair` stores the data of a chart inside the chart itself, so plotting from the patient rows would make the notebook and the browser slow as the data grows. Summarising first keeps the chart small and fast however many patients or subgroups there are.
+    """
+    )
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md(r"""# 9. Performance profile""")
+    return
+
+
+@app.cell(hide_code=True)
+def _(
+    CANDIDATE_SCHEMA,
+    FULL_DATASET_SHEET,
+    WORKBOOK_SCHEMAS,
+    contingency_tables,
+    cube,
+    descriptive_proportions,
+    df,
+    excel_file_path,
+    load_workbook_cached,
+    profiling_enabled,
+    stratified_agreement,
+    threshold_sweep,
+    time_stages,
+):
+    # --- Time of the main pipeline stages, only when profiling is enabled ---
+    if profiling_enabled():
+        _profiler = time_stages({
+            "load df (workbook cache)": lambda: load_workbook_cached(
+                excel_file_path,
+                sheet_names=[FULL_DATASET_SHEET],
+                schemas=WORKBOOK_SCHEMAS,
+                optional_schemas={FULL_DATASET_SHEET: CANDIDATE_SCHEMA},
+            )[FULL_DATASET_SHEET],
+            "contingency_tables": lambda: contingency_tables(df),
+            "descriptive_proportions": lambda: descriptive_proportions(df),
+            "stratified_agreement": lambda: stratified_agreement(
+                df, grouping_sets=[*cube("age_band", "sex"), ("season",)]
+            ),
+            "threshold_sweep": lambda: threshold_sweep(df),
+        })
+        print("--- Pipeline stage timings ---")
+        print(_profiler.timing_table())
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ### Explanation
+
+    **What this cell does:** When profiling is enabled (with `python main.py run --profile`, or by setting the `CHRISTINA_PAPER_PROFILE` environment variable to `1`), this cell runs the main stages of the analysis once more and prints how long each took, slowest first: the wall-clock and CPU time, the growth of peak memory, and the number of rows it returns. The stages are the load of `df` (from the workbook cache), the cohort counts of Sections 2-3, the descriptive table of Section 4, the subgroup table of Section 5 and the threshold sweep of Section 6.
+
+    It prints nothing otherwise.
+
+    **Why we do it:** The headless runner times every cell, but the interactive notebook has no such table. This gives the same kind of numbers while working in the notebook, so a slow stage can be spotted without leaving it.
+    """
+    )
+    return
+
+
+@app.cell(hide_code=True)
+def _(df, profiling_enabled, query_plans):
+    # --- Query plans of the cohort queries, only when profiling is enabled ---
+    # Enable with `python main.py run --profile` or CHRISTINA_PAPER_PROFILE=1
+    if profiling_enabled():
+        for _name, _plan in query_plans(df).items():
+            print(f"=== {_name} ===\n{_plan}\n")
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ### Explanation
+
+    **What this cell does:** When profiling is enabled (with `python main.py run --profile`, or by setting the `CHRISTINA_PAPER_PROFILE` environment variable to `1`), this cell prints how `polars` runs each cohort query:
+
+    *   The optimized query plan (`explain`), which shows e.g. whether the cohort filter was pushed down next to the data.
+    
+    *   The time it takes to run the query, and the number of rows it returns.
+    
+    It prints nothing otherwise. A profiled headless run also executes and times every cell, ignoring the cell cache (wall and CPU time, growth of peak memory and the number of rows it returns), prints the slowest cells first, and writes `trace.json`, which can be opened in `chrome://tracing` or Perfetto.
+
+    **Why we do it:** When the notebook feels slow, this tells us which cell is responsible (the sheet preview, the load of `df`, or the cohort counts) and, for the cohort queries, how `polars` plans to run them, instead of guessing.
+    """
+    )
+    return
+
+
 @app.cell
 def _():
     import marimo as mo
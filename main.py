@@ -1,5 +1,137 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+from christina_paper.export import EXPORTED_TABLES, cohort_frames, write_tables
+from christina_paper.profiling import PROFILE_ENV_VAR, Profiler, profiling_enabled
+from christina_paper.runner import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_NOTEBOOK,
+    EXECUTED,
+    SKIPPED,
+    cached_outputs,
+    run_notebook,
+    write_report,
+)
+from christina_paper.verify import SUPPLEMENT_FILE, verify_supplement
+
+
+def verify(df, supplement: Path, required: bool) -> None:
+    """Fail the run if the data does not reproduce the supplementary tables.
+
+    A missing workbook skips the check, unless it was asked for (``required``).
+    """
+    import polars as pl
+
+    if not supplement.exists():
+        if required:
+            raise SystemExit(f"Supplementary tables not found: {supplement}")
+        print(f"Supplementary tables not verified: {supplement} not found")
+        return
+    start = time.perf_counter()
+    disagreements = verify_supplement(df, supplement)
+    unexpected = disagreements.filter(pl.col("note").is_null())
+    for cell in disagreements.with_columns(pl.col("published", "computed").round(4)).iter_rows(named=True):
+        print(
+            f"{cell['table']}, {cell['row']}, {cell['group']}: "
+            f"published {cell['published']}, computed {cell['computed']}"
+            f" ({cell['note'] or 'unexpected'})"
+        )
+    print(
+        f"Supplementary tables verified in {time.perf_counter() - start:.2f}s: "
+        f"{disagreements.height} cells differ, {unexpected.height} unexpected"
+    )
+    if not unexpected.is_empty():
+        raise SystemExit(f"{unexpected.height} cells of {supplement} are not reproduced by the data")
+
+
+def run(args: argparse.Namespace) -> None:
+    if args.profile:
+        os.environ[PROFILE_ENV_VAR] = "1"
+    profiler = Profiler() if profiling_enabled() else None
+
+    start = time.perf_counter()
+    results = run_notebook(
+        args.data, notebook_path=args.notebook, cache_dir=args.cache_dir, profiler=profiler
+    )
+    report = write_report(results, args.out)
+    outputs = cached_outputs(
+        ["df", *EXPORTED_TABLES], args.data, notebook_path=args.notebook, cache_dir=args.cache_dir
+    )
+    # Only export results whose data still reproduces the published tables
+    if not args.no_verify:
+        supplement = args.supplement or args.data.with_name(SUPPLEMENT_FILE)
+        verify(outputs["df"], supplement, required=args.supplement is not None)
+
+    # Numeric results and cohort patients for downstream readers, as Arrow IPC
+    tables = {name: outputs[name] for name in EXPORTED_TABLES} | cohort_frames(outputs["df"])
+    arrow_dir = args.out / "arrow"
+    write_tables(tables, arrow_dir)
+
+    executed = [result.cell.index for result in results if result.status == EXECUTED]
+    skipped = sum(result.status == SKIPPED for result in results)
+    cached = len(results) - len(executed) - skipped
+    print(f"{len(results)} cells: {len(executed)} executed, {cached} from cache, {skipped} skipped")
+    if executed:
+        print(f"Executed cells: {', '.join(map(str, executed))}")
+    print(f"Report and {len(tables)} Arrow tables ({arrow_dir}) written in {time.perf_counter() - start:.2f}s")
+    if profiler is not None:
+        print()
+        print(profiler.timing_table())
+        print(f"Trace written to {profiler.write_trace(args.out / 'trace.json')}")
+
+
+def sites(args: argparse.Namespace) -> None:
+    import polars as pl
+
+    from christina_paper.sites import multi_site_agreement
+
+    start = time.perf_counter()
+    metrics = multi_site_agreement(args.data, n_jobs=args.jobs)
+    elapsed = time.perf_counter() - start
+
+    with pl.Config(tbl_rows=-1):
+        print(metrics)
+    n_sites = metrics["site"].n_unique() - 1
+    print(f"{n_sites} sites in {elapsed:.2f}s with {args.jobs} worker(s)")
+    if args.out is not None:
+        args.out.mkdir(parents=True, exist_ok=True)
+        metrics.write_csv(args.out / "site_agreement.csv")
+
+
 def main():
-    print("Hello from christina-paper!")
+    parser = argparse.ArgumentParser(prog="christina-paper")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the analysis notebook headlessly")
+    run_parser.add_argument("--data", required=True, type=Path, help="Path to the dataset workbook (.xlsx)")
+    run_parser.add_argument("--out", required=True, type=Path, help="Directory for the report")
+    run_parser.add_argument("--notebook", type=Path, default=DEFAULT_NOTEBOOK)
+    run_parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    run_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Time every executed cell and write a Chrome trace (same as setting {PROFILE_ENV_VAR}=1)",
+    )
+    run_parser.add_argument(
+        "--supplement",
+        type=Path,
+        help=f"Published supplementary tables to verify against (default: '{SUPPLEMENT_FILE}' next to --data)",
+    )
+    run_parser.add_argument(
+        "--no-verify", action="store_true", help="Skip the check against the supplementary tables"
+    )
+    run_parser.set_defaults(handler=run)
+
+    sites_parser = commands.add_parser("sites", help="Per-site and pooled PPA/NPA of several workbooks")
+    sites_parser.add_argument("--data", required=True, help="Glob of site workbooks, e.g. 'exports/*.xlsx'")
+    sites_parser.add_argument("--out", type=Path, help="Directory for site_agreement.csv")
+    sites_parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Worker processes")
+    sites_parser.set_defaults(handler=sites)
+
+    args = parser.parse_args()
+    args.handler(args)
 
 
 if __name__ == "__main__":